@@ -0,0 +1,367 @@
+"""Benchmarks for thinkbayes2 and the football models.
+
+Run with: python benchmarks.py [directory of saved pages]
+"""
+
+from __future__ import print_function, division
+
+import os
+import shutil
+import subprocess
+import sys
+import timeit
+
+import numpy
+
+import thinkbayes2
+from extract import select
+from football1 import ScoreType
+from football2 import BooleanEstimator, Football
+from live import LiveGame
+from matchup import LinePricer
+
+
+def TimeIt(func, number):
+    """Times a function, in seconds per call.
+
+    func: function with no arguments
+    number: how many times to call it
+
+    returns: float seconds
+    """
+    return timeit.timeit(func, number=number) / number
+
+
+def PrintRow(name, size, slow, fast):
+    """Prints one line of a comparison between two implementations."""
+    print('%-12s %6d %12.1f %12.1f %8.1fx' %
+          (name, size, slow * 1e6, fast * 1e6, slow / fast))
+
+
+def PrintHeader(slow, fast):
+    """Prints the header of a comparison table."""
+    print('%-12s %6s %12s %12s %9s' %
+          ('operation', 'size', slow + ' us', fast + ' us', 'speedup'))
+
+
+def BenchStorage(sizes=(201, 2001, 20001), number=20):
+    """Compares dict and array storage for ScoreType suites.
+
+    sizes: grid sizes to run
+    number: number of calls to time for each operation
+    """
+    PrintHeader('dict', 'array')
+    for size in sizes:
+        hypos = numpy.linspace(0, 20, size)
+        suites = dict(dict=ScoreType(hypos, storage='dict'),
+                      array=ScoreType(hypos, storage='array'))
+
+        ops = [('Update', lambda suite: suite.Update(10.0)),
+               ('Normalize', lambda suite: suite.Normalize()),
+               ('Mean', lambda suite: suite.Mean())]
+
+        for name, op in ops:
+            times = [TimeIt(lambda: op(suites[storage]), number)
+                     for storage in ['dict', 'array']]
+            PrintRow(name, size, *times)
+
+
+def BenchAddition(highs=(20, 60, 150), number=20):
+    """Compares the generic and lattice paths for adding score Pmfs.
+
+    The Pmfs look like the ones in football1.Football.PredRemaining:
+    Poisson counts of field goals and touchdowns, times 3 and 7.
+
+    highs: upper bounds of the Poisson Pmfs
+    number: number of calls to time for each operation
+    """
+    PrintHeader('loops', 'lattice')
+    for high in highs:
+        fgs = thinkbayes2.MakePoissonPmf(high / 10, high) * 3
+        tds = thinkbayes2.MakePoissonPmf(high / 8, high) * 7
+
+        ops = [('AddPmf', lambda: fgs + tds),
+               ('SubPmf', lambda: fgs - tds)]
+
+        for name, op in ops:
+            fast = TimeIt(op, number)
+            saved = thinkbayes2.LATTICE_MIN_PAIRS
+            thinkbayes2.LATTICE_MIN_PAIRS = float('inf')
+            slow = TimeIt(op, max(number // high, 1))
+            thinkbayes2.LATTICE_MIN_PAIRS = saved
+            PrintRow(name, high + 1, slow, fast)
+
+
+class ScalarScoreType(ScoreType):
+    """ScoreType that only has the scalar Likelihood."""
+    VectorLikelihood = thinkbayes2.Suite.VectorLikelihood
+
+
+class ScalarBooleanEstimator(BooleanEstimator):
+    """BooleanEstimator that only has the scalar Likelihood."""
+    VectorLikelihood = thinkbayes2.Suite.VectorLikelihood
+
+
+def MakeSeason(games=17, scores_per_game=4.5, td_fraction=0.6, seed=17):
+    """Makes a synthetic season of scoring events for one team.
+
+    games: number of games
+    scores_per_game: mean number of scores per game
+    td_fraction: probability that a score is a touchdown
+
+    returns: list of (inter-arrival time in minutes, boolean TD flag)
+    """
+    thinkbayes2.RandomSeed(seed)
+    n = numpy.random.poisson(games * scores_per_game)
+    times = numpy.random.exponential(60.0 / scores_per_game, n)
+    tds = numpy.random.random(n) < td_fraction
+    return [(time, bool(td)) for time, td in zip(times, tds)]
+
+
+def BenchSeason(size=201, number=5):
+    """Compares scalar and vector likelihoods for a season of updates.
+
+    size: grid size
+    number: number of seasons to time
+    """
+    season = MakeSeason()
+    hypos = numpy.linspace(0, 20, size)
+    probs = numpy.linspace(0, 1, size)
+
+    def Run(score_type, estimator, storage):
+        score = score_type(hypos, storage=storage)
+        td_percent = estimator(probs, storage=storage)
+        for time, td in season:
+            score.Update(time)
+            td_percent.Update(td)
+
+    print('full season of %d scoring events' % len(season))
+    PrintHeader('scalar', 'vector')
+    slow = TimeIt(lambda: Run(ScalarScoreType, ScalarBooleanEstimator,
+                              'dict'), number)
+    fast = TimeIt(lambda: Run(ScoreType, BooleanEstimator, 'array'), number)
+    PrintRow('Update', size, slow, fast)
+
+
+def LoopPredRemaining(suite, rem_time):
+    """The original ScoreType.PredRemaining: one Poisson Pmf per lambda.
+
+    suite: ScoreType
+    rem_time: remaining time in the game in minutes
+
+    returns: Pmf of the number of goals in the remaining time
+    """
+    metapmf = thinkbayes2.Pmf()
+    for lam, prob in suite.Items():
+        lt = lam * rem_time / 60
+        metapmf[thinkbayes2.MakePoissonPmf(lt, 20)] = prob
+
+    mix = thinkbayes2.Pmf()
+    for pmf, p1 in metapmf.Items():
+        for x, p2 in pmf.Items():
+            mix.Incr(x, p1 * p2)
+    return mix
+
+
+def BenchMixture(size=201, number=20):
+    """Compares the original and matrix mixtures for PredRemaining.
+
+    size: grid size
+    number: number of calls to time
+    """
+    suite = ScoreType(numpy.linspace(0, 20, size))
+    suite.UpdateFromStats(40, 600)
+    ks, matrix = thinkbayes2.MakePoissonMatrix(suite.d.xs, 20)
+
+    PrintHeader('loops', 'matrix')
+    slow = TimeIt(lambda: LoopPredRemaining(suite, 60), number)
+    fast = TimeIt(lambda: suite.PredRemaining(60, 0), number)
+    PrintRow('PredRemain', size, slow, fast)
+
+    fast = TimeIt(lambda: thinkbayes2.MakeMixtureMatrix(suite.d.ps, matrix, ks),
+                  number)
+    PrintRow('MixMatrix', size, slow, fast)
+
+
+def BenchPoissonTable(size=201, number=5):
+    """Compares cold and warm PoissonTables over every minute of a game.
+
+    size: grid size
+    number: number of games to time
+    """
+    suite = ScoreType(numpy.linspace(0, 20, size))
+    suite.UpdateFromStats(40, 600)
+
+    def Game():
+        for rem_time in range(60, 0, -1):
+            suite.PredRemaining(rem_time, 0)
+
+    def Cold():
+        thinkbayes2.POISSON_TABLE.Clear()
+        Game()
+
+    PrintHeader('cold', 'warm')
+    slow = TimeIt(Cold, number)
+    fast = TimeIt(Game, number)
+    PrintRow('Game', size, slow, fast)
+    print(thinkbayes2.POISSON_TABLE.Stats())
+
+
+def LoopPointsRemaining(football, rem_time):
+    """The original football2.Football.PredRemaining: one binomial split
+    per TD probability hypothesis and number of scores.
+
+    football: football2.Football
+    rem_time: remaining time in the game in minutes
+
+    returns: Pmf of the number of points in the remaining time
+    """
+    scorePredict = football.score.PredRemaining(rem_time, 0)
+    scorePmf = thinkbayes2.Pmf()
+    for prob_td, prob_p in football.TDPercent.Items():
+        tdProbPmf = thinkbayes2.Pmf()
+        for scores, prob_s in scorePredict.Items():
+            for num_tds in range(scores + 1):
+                num_fgs = scores - num_tds
+                points = 7 * num_tds + 3 * num_fgs
+                ncr = thinkbayes2.BinomialCoef(scores, num_tds)
+                tdProbPmf.Incr(points, prob_s * ncr *
+                               (prob_td**num_tds * (1 - prob_td)**num_fgs))
+        scorePmf.Incr(tdProbPmf, prob_p)
+    return thinkbayes2.MakeMixture(scorePmf)
+
+
+def BenchPoints(size=201, number=5):
+    """Compares the original and vectorized football2 PredRemaining.
+
+    size: grid size of the TD probability
+    number: number of calls to time
+    """
+    football = Football((numpy.linspace(0, 20, 201),
+                         numpy.linspace(0, 1, size)))
+    football.UpdateFromStats((40, 600, 24))
+
+    PrintHeader('loops', 'vector')
+    slow = TimeIt(lambda: LoopPointsRemaining(football, 60), 1)
+    fast = TimeIt(lambda: football.PredRemaining(60, 0), number)
+    PrintRow('PredPoints', size, slow, fast)
+
+
+def BenchLive(number=10000):
+    """Times LiveGame updates once the clock is cached.
+
+    number: number of updates to time
+    """
+    teams = []
+    for stats in [(40, 900, 24), (35, 900, 20)]:
+        football = Football((numpy.linspace(0, 20, 201),
+                             numpy.linspace(0, 1, 201)))
+        football.UpdateFromStats(stats)
+        teams.append(football)
+
+    game = LiveGame(*teams)
+    precompute = TimeIt(game.Precompute, 1)
+    update = TimeIt(lambda: game.Apply((30.2, None, None)), number)
+    print('LiveGame precompute %.1f ms, update %.1f us' %
+          (precompute * 1e3, update * 1e6))
+
+
+def BenchLines(number=100):
+    """Compares pricing a board of lines one at a time and with a LinePricer.
+
+    Both start from the margin and total distributions of one matchup.
+
+    number: number of boards to time
+    """
+    teams = []
+    for stats in [(40, 900, 24), (35, 900, 20)]:
+        football = Football((numpy.linspace(0, 20, 201),
+                             numpy.linspace(0, 1, 201)))
+        football.UpdateFromStats(stats)
+        teams.append(football)
+
+    spreads = numpy.arange(-20, 20.5, 0.5)
+    totals = numpy.arange(30, 60.5, 0.5)
+
+    pred_a = teams[0].PredRemaining(60, 0)
+    pred_b = teams[1].PredRemaining(60, 0)
+    margin = pred_a - pred_b
+    total = pred_a + pred_b
+    pricer = LinePricer(*teams)
+
+    def Loops():
+        return ([margin.ProbGreater(line) for line in spreads],
+                [total.ProbGreater(line) for line in totals])
+
+    def Pricer():
+        return pricer.Spreads(spreads), pricer.Totals(totals)
+
+    PrintHeader('loops', 'pricer')
+    slow = TimeIt(Loops, number)
+    fast = TimeIt(Pricer, number)
+    PrintRow('Board', len(spreads) + len(totals), slow, fast)
+
+
+SELECTORS = ["table.data td.datacell a attr{href}", "table.num-left text{}"]
+
+
+def Pup(page, selector):
+    """Runs the pup binary the way the scrapers used to."""
+    output = subprocess.check_output(['pup', selector],
+                                     input=page.encode('utf-8'))
+    return output.decode('utf-8').splitlines(True)
+
+
+def BenchExtract(directory):
+    """Compares pup and the in-process extractor on saved pages.
+
+    Both selectors the scrapers use run on every page.  Without pup on
+    the path, only the extractor is timed.
+
+    directory: directory of saved covers.com pages
+    """
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), 'rb') as f:
+            pages.append(f.read().decode('utf-8', 'replace'))
+
+    def Run(extract):
+        return [extract(page, selector)
+                for page in pages for selector in SELECTORS]
+
+    fast = TimeIt(lambda: Run(select), 1)
+    if shutil.which('pup') is None:
+        print('%d pages: extract %.1f ms per page (pup not found)' %
+              (len(pages), fast / len(pages) * 1e3))
+        return
+
+    PrintHeader('pup', 'extract')
+    slow = TimeIt(lambda: Run(Pup), 1)
+    PrintRow('Extract', len(pages), slow, fast)
+    if Run(Pup) != Run(select):
+        print('warning: the outputs are different')
+
+
+def main():
+    BenchStorage()
+    print()
+    BenchAddition()
+    print()
+    BenchSeason()
+    print()
+    BenchMixture()
+    print()
+    BenchPoissonTable()
+    print()
+    BenchPoints()
+    print()
+    BenchLive()
+    print()
+    BenchLines()
+    if len(sys.argv) > 1:
+        print()
+        BenchExtract(sys.argv[1])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""On-disk cache of scraped pages and parsed box scores.
+
+Entries are keyed by a hash of the url.  Raw pages are stored as html
+files and parsed box scores as json files, next to each other:
+
+    <directory>/html/<key>.html
+    <directory>/events/<key>.json
+
+Completed games never change, so box scores don't need to expire;
+pages that do change, like a team's list of games, can be looked up
+with a max_age.  An entry's modification time is when it was fetched,
+and its access time is when it was last used; when the cache gets
+bigger than max_bytes, the least recently used entries are evicted.
+
+In offline mode the cache is read-only, entries never expire, and a
+missing page is an error instead of a download.  A missing parsed box
+score isn't an error, since it can still be parsed from its page.
+"""
+
+from __future__ import print_function, division
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from fetch import FetchError
+
+DEFAULT_DIRECTORY = os.environ.get("SCRAPE_CACHE", ".scrape_cache")
+
+class CacheMiss(FetchError):
+    """Raised in offline mode when a url isn't in the cache."""
+
+class PageCache(object):
+    """Caches raw pages and parsed box scores on disk."""
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_age=None,
+                 max_bytes=512 * 2**20, offline=False):
+        """directory: where to keep the cache
+        max_age: default maximum age of an entry in seconds, or None
+        max_bytes: maximum total size of the cache, or None
+        offline: whether to only read the cache
+        """
+        self.directory = directory
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        #total size of the entries, counted on the first write
+        self.nbytes = None
+
+    def _Path(self, kind, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        extension = "html" if kind == "html" else "json"
+        return os.path.join(self.directory, kind, key + "." + extension)
+
+    def _Read(self, kind, url, max_age, required=True):
+        """Reads an entry, or returns None if it's missing or too old.
+
+        required: whether a miss in offline mode raises CacheMiss
+        """
+        path = self._Path(kind, url)
+        if max_age is None:
+            max_age = self.max_age
+        if self.offline:
+            max_age = None
+        try:
+            fetched = os.path.getmtime(path)
+            if max_age is not None and time.time() - fetched > max_age:
+                raise IOError("expired")
+            with open(path, "rb") as f:
+                data = f.read().decode("utf-8")
+        except (IOError, OSError):
+            with self.lock:
+                self.misses += 1
+            if self.offline and required:
+                raise CacheMiss("offline, and not in the cache: %s" % url)
+            return None
+
+        with self.lock:
+            self.hits += 1
+        if not self.offline:
+            #reading counts as a use, for eviction, but not as a fetch
+            try:
+                os.utime(path, (time.time(), fetched))
+            except OSError:
+                pass
+        return data
+
+    def _Write(self, kind, url, data):
+        """Writes an entry atomically, then evicts if the cache is too big."""
+        if self.offline:
+            return
+        path = self._Path(kind, url)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        data = data.encode("utf-8")
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+
+        fd, temp = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp, path)
+
+        with self.lock:
+            if self.nbytes is None:
+                self.nbytes = sum(size for _, size, _ in self.Entries())
+            else:
+                self.nbytes += len(data) - old_size
+            too_big = self.max_bytes is not None and self.nbytes > self.max_bytes
+        if too_big:
+            self.Evict()
+
+    def GetPage(self, url, max_age=None):
+        """Gets a raw page, or None.
+
+        max_age: maximum age in seconds, instead of the default
+        """
+        return self._Read("html", url, max_age)
+
+    def PutPage(self, url, text):
+        """Stores a raw page."""
+        self._Write("html", url, text)
+
+    def GetEvents(self, url):
+        """Gets the parsed scoring events of a box score, or None, even in
+        offline mode.
+
+        Returns a list of (time left in game, scoring type, team) tuples
+        """
+        data = self._Read("events", url, float("inf"), required=False)
+        if data is None:
+            return None
+        return [tuple(event) for event in json.loads(data)]
+
+    def PutEvents(self, url, events):
+        """Stores the parsed scoring events of a box score."""
+        self._Write("events", url, json.dumps(events))
+
+    def Entries(self):
+        """Lists the files in the cache.
+
+        Returns a list of (last use, size, path) tuples
+        """
+        entries = []
+        for kind in ["html", "events"]:
+            directory = os.path.join(self.directory, kind)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, path))
+        return entries
+
+    def Evict(self):
+        """Removes the least recently used entries until the cache fits."""
+        if self.max_bytes is None or self.offline:
+            return
+        with self.lock:
+            entries = sorted(self.Entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+            self.nbytes = total
+
+    def Stats(self):
+        """Returns a dictionary with the number of entries, bytes, hits and misses."""
+        entries = self.Entries()
+        return dict(entries=len(entries), nbytes=sum(size for _, size, _ in entries),
+                    hits=self.hits, misses=self.misses)
@@ -0,0 +1,348 @@
+"""Columnar store of scoring events.
+
+Each season is kept as two .npy files of structured arrays, which are
+memory-mapped when read:
+
+    <directory>/<season>.games.npy    one record per game, in the order
+                                      they were played
+    <directory>/<season>.events.npy   one record per scoring event
+
+and teams.json has the team names; team ids index into it.  New games
+are appended to the end of the files, without rewriting them.
+
+Each game has a key, a hash of its box score url, so a game that is
+added once for each of its teams is only stored once.
+
+TeamStats computes the same statistics as seasonStats in football1 and
+football2 straight from the arrays, for any number of seasons, so the
+models can be updated without building the lists of games.
+"""
+
+from __future__ import print_function, division
+
+import glob
+import hashlib
+import io
+import json
+import os
+
+import numpy
+from numpy.lib import format as npy_format
+
+SCORE_TYPES = ["FG", "TD"]
+POINTS = {"FG": 3, "TD": 7}
+
+#team_b is -1 when the opponent is unknown
+GAME_DTYPE = numpy.dtype([('key', 'u8'), ('team_a', 'i2'), ('team_b', 'i2')])
+
+#game indexes into the games of the same season; type into SCORE_TYPES
+EVENT_DTYPE = numpy.dtype([('game', 'i4'), ('team', 'i2'), ('rem_time', 'f4'),
+                           ('type', 'i1'), ('points', 'i1')])
+
+def gameKey(url):
+    """Computes the key of a game from its box score url."""
+    return int(hashlib.sha256(url.encode("utf-8")).hexdigest()[:16], 16)
+
+def eventsKey(events):
+    """Computes a key for a game from its scoring events, for games
+    whose box score url isn't known."""
+    return gameKey(json.dumps([list(event) for event in events]))
+
+def appendRecords(path, records):
+    """Appends records to a 1-D .npy file, creating it if needed.
+
+    The header is rewritten in place when it still fits, which it does
+    for files written by numpy 1.24 or later; otherwise the whole file is
+    rewritten.
+    """
+    if not os.path.exists(path):
+        numpy.save(path, records)
+        return
+
+    with open(path, "r+b") as f:
+        version = npy_format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran, dtype = npy_format.read_array_header_1_0(f)
+        else:
+            shape, fortran, dtype = npy_format.read_array_header_2_0(f)
+        if dtype != records.dtype or fortran or len(shape) != 1:
+            raise ValueError("Can't append %s records to %s" % (records.dtype, path))
+        offset = f.tell()
+
+        header = io.BytesIO()
+        d = dict(descr=npy_format.dtype_to_descr(dtype), fortran_order=False,
+                 shape=(shape[0] + len(records),))
+        if version == (1, 0):
+            npy_format.write_array_header_1_0(header, d)
+        else:
+            npy_format.write_array_header_2_0(header, d)
+
+        if len(header.getvalue()) == offset:
+            f.seek(offset + shape[0] * dtype.itemsize)
+            f.write(records.tobytes())
+            f.truncate()
+            f.seek(0)
+            f.write(header.getvalue())
+            return
+
+    old = numpy.load(path)
+    numpy.save(path, numpy.concatenate([old, records]))
+
+class EventStore(object):
+    """Stores the scoring events of many seasons."""
+
+    def __init__(self, directory):
+        """directory: where to keep the files; created when needed"""
+        self.directory = directory
+        self.teams = []
+        path = os.path.join(directory, "teams.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                self.teams = json.load(f)
+        self.team_ids = dict((name, i) for i, name in enumerate(self.teams))
+
+        #games and events added since the last Flush, by season
+        self.new_games = {}
+        self.new_events = {}
+        #maps from key to game id for each season, read when first needed
+        self.keys = {}
+
+    def _Path(self, season, kind):
+        return os.path.join(self.directory, "%s.%s.npy" % (season, kind))
+
+    def Seasons(self):
+        """Returns a sorted list of the seasons in the store."""
+        seasons = set(self.new_games)
+        for path in glob.glob(os.path.join(self.directory, "*.games.npy")):
+            seasons.add(os.path.basename(path)[:-len(".games.npy")])
+        return sorted(seasons)
+
+    def TeamId(self, name):
+        """Gets the id of a team, adding it if it's new."""
+        if name not in self.team_ids:
+            self.team_ids[name] = len(self.teams)
+            self.teams.append(name)
+        return self.team_ids[name]
+
+    def Games(self, season):
+        """Reads the games of a season, memory-mapped.
+
+        Returns an array of GAME_DTYPE
+        """
+        return self._Load(season, "games", GAME_DTYPE)
+
+    def Events(self, season):
+        """Reads the scoring events of a season, memory-mapped.
+
+        Returns an array of EVENT_DTYPE
+        """
+        return self._Load(season, "events", EVENT_DTYPE)
+
+    def _Load(self, season, kind, dtype):
+        path = self._Path(season, kind)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return numpy.zeros(0, dtype=dtype)
+        return numpy.load(path, mmap_mode="r")
+
+    def _Keys(self, season):
+        if season not in self.keys:
+            keys = self.Games(season)["key"].tolist()
+            self.keys[season] = dict((key, i) for i, key in enumerate(keys))
+        return self.keys[season]
+
+    def _FillOpponent(self, season, game, teams):
+        """Fills in the unknown opponent of a game that's already there."""
+        on_disk = len(self.Games(season))
+        if game < on_disk:
+            team_a, team_b = self.Games(season)[["team_a", "team_b"]][game].tolist()
+        else:
+            _, team_a, team_b = self.new_games[season][game - on_disk]
+        if team_b >= 0:
+            return
+        others = [name for name in teams if name is not None and self.TeamId(name) != team_a]
+        if not others:
+            return
+
+        team_b = self.TeamId(others[0])
+        if game < on_disk:
+            games = numpy.load(self._Path(season, "games"), mmap_mode="r+")
+            games["team_b"][game] = team_b
+            games.flush()
+            del games
+        else:
+            new = self.new_games[season]
+            new[game - on_disk] = new[game - on_disk][:2] + (team_b,)
+
+    def AddGame(self, season, key, teams, events):
+        """Adds a game, unless a game with the same key is already there.
+
+        season: name of the season, like "2014"
+        key: from gameKey or eventsKey
+        teams: names of the two teams; the second can be None
+        events: list of (time left in game, scoring type, team) tuples,
+                as from scrape_box_score
+
+        If the game is already there without an opponent, and one of the
+        teams isn't in it, that team becomes the opponent.
+
+        Returns whether the game was added
+        """
+        season = str(season)
+        keys = self._Keys(season)
+        if key in keys:
+            self._FillOpponent(season, keys[key], teams)
+            return False
+
+        games = self.new_games.setdefault(season, [])
+        game = len(self.Games(season)) + len(games)
+        keys[key] = game
+        team_b = -1 if teams[1] is None else self.TeamId(teams[1])
+        games.append((key, self.TeamId(teams[0]), team_b))
+
+        new_events = self.new_events.setdefault(season, [])
+        for rem_time, score_type, team in events:
+            new_events.append((game, self.TeamId(team), rem_time,
+                               SCORE_TYPES.index(score_type), POINTS[score_type]))
+        return True
+
+    def AddTeamGames(self, season, team, games, urls=None):
+        """Adds a team's games, as returned by scrape_team.
+
+        The opponent of each game is the other team that scored in it,
+        if there is one.
+
+        urls: box score urls of the games; without them, the games are
+              told apart by their events
+
+        Returns the number of games added
+        """
+        added = 0
+        for i, events in enumerate(games):
+            others = [event[2] for event in events if event[2] != team]
+            key = eventsKey(events) if urls is None else gameKey(urls[i])
+            teams = (team, others[0] if others else None)
+            added += self.AddGame(season, key, teams, events)
+        return added
+
+    def AddGames(self, games):
+        """Adds games from scrape.ingest.
+
+        Returns the number of games added
+        """
+        return sum(self.AddGame(game.season, gameKey(game.url), game.teams, game.events)
+                   for game in games)
+
+    def Flush(self):
+        """Appends the games and events added so far to the files."""
+        if not self.new_games:
+            return
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        for season, games in self.new_games.items():
+            #events first, so a game is never on disk without its events
+            events = numpy.array(self.new_events.get(season, []), dtype=EVENT_DTYPE)
+            if len(events):
+                appendRecords(self._Path(season, "events"), events)
+            appendRecords(self._Path(season, "games"), numpy.array(games, dtype=GAME_DTYPE))
+        self.new_games = {}
+        self.new_events = {}
+
+        path = os.path.join(self.directory, "teams.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.teams, f, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.Flush()
+
+    def TeamEvents(self, team, season):
+        """Gets the scoring events of one team in one season.
+
+        Returns an array of EVENT_DTYPE
+        """
+        events = self.Events(season)
+        if team not in self.team_ids:
+            return events[:0]
+        return events[events["team"] == self.team_ids[team]]
+
+    def Stats(self, seasons=None):
+        """Computes the statistics of every team, over several seasons.
+
+        As in seasonStats, the clock keeps running between games, and
+        between seasons.
+
+        seasons: list of seasons in the order they were played; all of
+                 them by default
+
+        Returns a dictionary that maps from "TD", "FG" and "all" to a
+        pair of arrays indexed by team id: the number of scores, and the
+        total time between scores in minutes
+        """
+        if seasons is None:
+            seasons = self.Seasons()
+        num_teams = len(self.teams)
+        counts = dict((kind, numpy.zeros(num_teams)) for kind in SCORE_TYPES + ["all"])
+        last = dict((kind, numpy.zeros(num_teams)) for kind in SCORE_TYPES + ["all"])
+        #minutes played by each team in the seasons before
+        offset = numpy.zeros(num_teams)
+
+        for season in seasons:
+            games = self.Games(str(season))
+            events = self.Events(str(season))
+            position, num_games = _gamePositions(games, num_teams)
+
+            #only the games' own teams count, not an opponent whose
+            #window left the game out
+            listed = ((events["team"] == games["team_a"][events["game"]]) |
+                      (events["team"] == games["team_b"][events["game"]]))
+            events = events[listed]
+
+            #time since the start of the first season, as of each event
+            side = (events["team"] == games["team_b"][events["game"]]).astype(int)
+            team = events["team"].astype(int)
+            clock = (offset[team] + 60.0 * (position[events["game"], side] + 1)
+                     - events["rem_time"])
+
+            for kind in SCORE_TYPES + ["all"]:
+                if kind == "all":
+                    mask = numpy.ones(len(events), dtype=bool)
+                else:
+                    mask = events["type"] == SCORE_TYPES.index(kind)
+                counts[kind] += numpy.bincount(team[mask], minlength=num_teams)
+                #the clock only moves forward, so the last score is the latest
+                numpy.maximum.at(last[kind], team[mask], clock[mask])
+            offset += 60.0 * num_games
+
+        return dict((kind, (counts[kind], last[kind])) for kind in counts)
+
+    def TeamStats(self, team, seasons=None):
+        """Computes the statistics of one team, like Stats.
+
+        Returns a dictionary that maps from "TD", "FG" and "all" to
+        (number of scores, total time between scores in minutes)
+        """
+        i = self.team_ids[team]
+        stats = self.Stats(seasons)
+        return dict((kind, (int(n[i]), float(t[i]))) for kind, (n, t) in stats.items())
+
+def _gamePositions(games, num_teams):
+    """Numbers each team's games in the order they were played.
+
+    Returns a tuple of (array with the position of each game for
+    team_a and team_b, number of games of each team)
+    """
+    teams = numpy.stack([games["team_a"], games["team_b"]], axis=1).astype(int)
+    flat = teams.ravel()
+    known = flat >= 0
+    num_games = numpy.bincount(flat[known], minlength=num_teams)
+
+    #a stable sort keeps each team's games in order
+    order = numpy.flatnonzero(known)[numpy.argsort(flat[known], kind="stable")]
+    starts = numpy.concatenate([[0], numpy.cumsum(num_games)[:-1]])
+    position = numpy.full(len(flat), -1)
+    position[order] = numpy.arange(len(order)) - starts[flat[order]]
+    return position.reshape(-1, 2), num_games
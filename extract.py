@@ -0,0 +1,339 @@
+"""In-process HTML extraction for the scrapers.
+
+select(page, selector) takes the same selectors the scrapers used to
+pass to pup, and returns the lines pup would print:
+
+    select(page, "table.data td.datacell a attr{href}")
+    select(page, "table.num-left text{}")
+
+A selector is a chain of simple selectors (tag, .class, or tag.class,
+with any number of classes) joined by the descendant combinator, and an
+optional display function: attr{name} prints one attribute of each
+matching element, text{} prints the text inside them.  Without a
+display function, select returns the text, like text{}.
+
+Like pup without --plain, the output is HTML-escaped.
+
+selectRows(page, selector) keeps each matching element apart instead,
+with its text and the links inside it, for pages where the fields of
+one row have to stay together.
+
+The page is parsed with html.parser as it is fed in, so it can be a
+string or an iterable of chunks.  Elements are opened and closed by the
+HTML5 rules pup's parser uses, so cells and rows whose end tags are
+left out close where pup would close them.
+"""
+
+from __future__ import print_function, division
+
+import re
+
+try:
+    from html.parser import HTMLParser
+except ImportError:
+    from HTMLParser import HTMLParser
+
+#elements that never have an end tag
+VOID_ELEMENTS = set(["area", "base", "br", "col", "embed", "hr", "img", "input",
+                     "link", "meta", "param", "source", "track", "wbr"])
+
+#the HTML5 special elements, which an unmatched end tag can't close
+SPECIAL_ELEMENTS = set("""address applet area article aside base basefont bgsound
+    blockquote body br button caption center col colgroup dd details dir div dl dt
+    embed fieldset figcaption figure footer form frame frameset h1 h2 h3 h4 h5 h6
+    head header hgroup hr html iframe img input keygen li link listing main marquee
+    menu meta nav noembed noframes noscript object ol p param plaintext pre script
+    search section select source style summary table tbody td template textarea
+    tfoot th thead title tr track ul wbr xmp""".split())
+
+#elements that end the scopes of the HTML5 parsing rules
+DEFAULT_SCOPE = set(["applet", "caption", "html", "table", "td", "th", "marquee",
+                     "object", "template"])
+LIST_ITEM_SCOPE = DEFAULT_SCOPE | set(["ol", "ul"])
+BUTTON_SCOPE = DEFAULT_SCOPE | set(["button"])
+TABLE_SCOPE = set(["html", "table", "template"])
+
+HEADINGS = set(["h1", "h2", "h3", "h4", "h5", "h6"])
+TABLE_SECTIONS = set(["tbody", "thead", "tfoot"])
+#where content that isn't part of a table gets foster parented
+TABLE_CONTEXTS = TABLE_SECTIONS | set(["table", "tr"])
+
+#start tags that end an open p
+CLOSES_P = HEADINGS | set("""address article aside blockquote center details dialog
+    dir div dl dd dt fieldset figcaption figure footer form header hgroup hr li
+    listing main menu nav ol p pre search section summary table ul xmp""".split())
+
+_DISPLAY = re.compile(r"^(.*?)\s+(attr\{([^}]*)\}|text\{\})\s*$")
+
+#the escapes of Go's html.EscapeString, which pup uses
+_ESCAPES = [("&", "&amp;"), ("'", "&#39;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&#34;")]
+
+def escape(text):
+    """Escapes text the way pup does."""
+    for char, entity in _ESCAPES:
+        text = text.replace(char, entity)
+    return text
+
+def parseSelector(selector):
+    """Parses a selector.
+
+    Returns a tuple of (list of (tag, classes) pairs, attribute name or None)
+    """
+    attr = None
+    match = _DISPLAY.match(selector)
+    if match:
+        selector = match.group(1)
+        attr = match.group(3)
+
+    parts = []
+    for simple in selector.split():
+        names = simple.split(".")
+        parts.append((names[0].lower() or None, frozenset(names[1:])))
+    if not parts:
+        raise ValueError("Empty selector: %r" % selector)
+    return parts, attr
+
+class _Selector(HTMLParser):
+    """Collects the output of one selector while a page is fed in.
+
+    The open elements are kept on a stack, which is opened and closed by
+    the HTML5 tree construction rules that matter for the scrapers: end
+    tags that are implied by other start tags, end tags that are ignored
+    because they would close a table cell or other special element, and
+    foster parenting, which moves content that's misplaced in a table
+    to before the table.
+    """
+
+    def __init__(self, parts, attr, plain):
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.parts = parts
+        self.attr = attr
+        self.escape = (lambda text: text) if plain else escape
+        #open elements, as (tag, number of selector parts matched,
+        #whether the element is inside a match)
+        self.stack = []
+        self.lines = []
+        #pieces of the current text node; a node can span several feeds
+        self.text = []
+
+    def _Find(self, tags, boundaries):
+        """Finds the most recent open element with one of the tags, without
+        crossing a boundary; returns its index in the stack or None."""
+        for i in range(len(self.stack) - 1, -1, -1):
+            tag = self.stack[i][0]
+            if tag in tags:
+                return i
+            if tag in boundaries:
+                return None
+        return None
+
+    def _PopTo(self, i):
+        """Closes the element at index i of the stack and everything after it."""
+        del self.stack[i:]
+
+    def _Close(self, tags, boundaries):
+        """Closes the most recent open element with one of the tags, if it's
+        in scope; returns whether there was one."""
+        i = self._Find(tags, boundaries)
+        if i is None:
+            return False
+        self._PopTo(i)
+        return True
+
+    def _Current(self):
+        return self.stack[-1][0] if self.stack else None
+
+    def _Parent(self, foster):
+        """Gets the entry of the element new content goes into."""
+        if foster:
+            #before the table, so into the table's parent
+            i = self._Find(["table"], ())
+            return self.stack[i - 1] if i else None
+        return self.stack[-1] if self.stack else None
+
+    def _ImplyEndTags(self, tag):
+        """Closes the elements that a start tag implicitly ends.
+
+        Returns whether the tag is ignored, and whether it's foster parented
+        """
+        in_table = self._Find(["table"], TABLE_SCOPE) is not None
+
+        if tag in ("td", "th", "tr", "tbody", "thead", "tfoot", "caption",
+                   "col", "colgroup"):
+            if not in_table:
+                return True, False
+            if tag in ("td", "th", "tr"):
+                self._Close(["td", "th"], TABLE_SCOPE)
+            if tag == "tr":
+                self._Close(["tr"], TABLE_SCOPE)
+            if tag in ("tbody", "thead", "tfoot", "caption", "col", "colgroup"):
+                self._PopTo(self._Find(["table"], TABLE_SCOPE) + 1)
+            #rows go in a table section, and cells in a row
+            if tag in ("td", "th", "tr") and self._Current() == "table":
+                self.stack.append(self._Entry("tbody", {}, self._Parent(False)))
+            if tag in ("td", "th") and self._Current() in TABLE_SECTIONS:
+                self.stack.append(self._Entry("tr", {}, self._Parent(False)))
+            return False, False
+
+        if tag == "table" and in_table and self._Current() in TABLE_CONTEXTS:
+            self._Close(["table"], TABLE_SCOPE)
+            return False, False
+
+        foster = self._Current() in TABLE_CONTEXTS
+        if tag in CLOSES_P:
+            self._Close(["p"], BUTTON_SCOPE)
+        if tag == "li":
+            self._Close(["li"], LIST_ITEM_SCOPE)
+        elif tag in ("dd", "dt"):
+            self._Close(["dd", "dt"], DEFAULT_SCOPE | set(["dl"]))
+        elif tag in HEADINGS and self._Current() in HEADINGS:
+            self.stack.pop()
+        elif tag in ("option", "optgroup"):
+            if self._Current() == "option":
+                self.stack.pop()
+            if tag == "optgroup" and self._Current() == "optgroup":
+                self.stack.pop()
+        elif tag == "a":
+            self._Close(["a"], DEFAULT_SCOPE)
+        return False, foster
+
+    def _Entry(self, tag, attrs, parent):
+        """Matches a new element against the selector.
+
+        Returns its stack entry
+        """
+        matched, inside = parent[1:] if parent else (0, False)
+        if matched < len(self.parts):
+            want_tag, want_classes = self.parts[matched]
+            classes = set((attrs.get("class") or "").split())
+            if (want_tag is None or want_tag == tag) and want_classes <= classes:
+                matched += 1
+                if matched == len(self.parts) and not inside:
+                    inside = True
+                    self._Matched(tag, attrs)
+        return (tag, matched, inside)
+
+    def _Matched(self, tag, attrs):
+        """Called for each element that matches, but not inside another."""
+        if self.attr is not None and self.attr in attrs:
+            self.lines.append(self.escape(attrs[self.attr] or "") + "\n")
+
+    def _Flush(self):
+        if self.text:
+            data = self.escape("".join(self.text))
+            self.lines.extend(line + "\n" for line in data.split("\n"))
+            self.text = []
+
+    def handle_starttag(self, tag, attrs):
+        self._Flush()
+        ignore, foster = self._ImplyEndTags(tag)
+        if ignore:
+            return
+        entry = self._Entry(tag, dict(attrs), self._Parent(foster))
+        if tag not in VOID_ELEMENTS:
+            self.stack.append(entry)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self._Flush()
+        if tag in ("td", "th", "tr", "tbody", "thead", "tfoot", "table", "caption"):
+            self._Close([tag], TABLE_SCOPE)
+        elif tag == "li":
+            self._Close(["li"], LIST_ITEM_SCOPE)
+        elif tag == "p":
+            self._Close(["p"], BUTTON_SCOPE)
+        elif tag in HEADINGS:
+            self._Close(HEADINGS, DEFAULT_SCOPE)
+        elif tag in ("html", "body"):
+            pass
+        elif tag in SPECIAL_ELEMENTS:
+            self._Close([tag], DEFAULT_SCOPE)
+        else:
+            #the most recent element with the tag, unless a special
+            #element like a table cell is in the way
+            self._Close([tag], SPECIAL_ELEMENTS)
+
+    def handle_comment(self, data):
+        self._Flush()
+
+    def handle_data(self, data):
+        if self.attr is not None:
+            return
+        #text in a table, outside any cell, goes before the table
+        foster = self._Current() in TABLE_CONTEXTS and data.strip() != ""
+        if foster:
+            self._Flush()
+        parent = self._Parent(foster)
+        if parent is not None and parent[2]:
+            self.text.append(data)
+        if foster:
+            self._Flush()
+
+    def close(self):
+        HTMLParser.close(self)
+        self._Flush()
+
+class _RowSelector(_Selector):
+    """Collects the text and attributes of each matching element."""
+
+    def __init__(self, parts, attr):
+        _Selector.__init__(self, parts, None, True)
+        self.row_attr = attr
+        self.rows = []
+
+    def _Matched(self, tag, attrs):
+        self.rows.append(([], []))
+
+    def _Entry(self, tag, attrs, parent):
+        entry = _Selector._Entry(self, tag, attrs, parent)
+        if entry[2] and attrs.get(self.row_attr) is not None:
+            self.rows[-1][1].append(attrs[self.row_attr])
+        return entry
+
+    def _Flush(self):
+        if self.text:
+            self.rows[-1][0].append("".join(self.text))
+            self.text = []
+
+def _feed(parser, page):
+    if isinstance(page, str):
+        page = [page]
+    for chunk in page:
+        parser.feed(chunk)
+    parser.close()
+
+def selectRows(page, selector, attr="href"):
+    """Extracts each element that matches a selector, like a table row.
+
+    page: string, or iterable of strings
+    selector: selector without a display function
+    attr: attribute to collect from the element and everything inside it
+
+    Returns a list of (text, list of attribute values) pairs, one per
+    matching element; the text is unescaped, with a space between the
+    text of different elements
+    """
+    if _DISPLAY.match(selector):
+        raise ValueError("selectRows takes no display function: %r" % selector)
+    parts, _ = parseSelector(selector)
+    parser = _RowSelector(parts, attr)
+    _feed(parser, page)
+    return [(" ".join(text), values) for text, values in parser.rows]
+
+def select(page, selector, plain=False):
+    """Extracts the parts of a page that match a selector, like pup.
+
+    page: string, or iterable of strings
+    selector: selector and display function, see the module docstring
+    plain: whether to leave the output unescaped, like pup --plain
+
+    Returns a list of lines, each ending with a newline
+    """
+    parts, attr = parseSelector(selector)
+    parser = _Selector(parts, attr, plain)
+    _feed(parser, page)
+    return parser.lines
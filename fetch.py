@@ -0,0 +1,331 @@
+"""Concurrent page fetching for the scrapers.
+
+A Fetcher downloads pages on a bounded thread pool.  Each thread keeps
+one HTTP connection open per host, requests to each host are spaced
+out by a rate limit, and failed requests are retried with exponential
+backoff.
+
+A FixtureServer serves saved pages on localhost, so the scrapers can
+run against it instead of the real site.  It can also be told to answer
+a url with errors or redirects first, to test retries.
+"""
+
+from __future__ import print_function, division
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import http.client as httplib
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import quote, urljoin, urlsplit
+except ImportError:
+    import httplib
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import quote
+    from urlparse import urljoin, urlsplit
+
+#statuses worth trying again
+RETRY_STATUSES = set([429, 500, 502, 503, 504])
+
+class FetchError(Exception):
+    """Raised when a page can't be fetched."""
+
+class RateLimiter(object):
+    """Spaces out requests to one host."""
+
+    def __init__(self, rate):
+        """rate: maximum requests per second, or None for no limit"""
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def Wait(self):
+        """Blocks until the next request is allowed."""
+        with self.lock:
+            now = time.time()
+            wait = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+class Fetcher(object):
+    """Downloads pages concurrently over kept-alive connections."""
+
+    def __init__(self, max_workers=8, rate=5.0, retries=3, backoff=0.5,
+                 timeout=30, max_redirects=5):
+        """max_workers: number of threads
+        rate: maximum requests per second to each host, or None
+        retries: number of times to retry a failed request
+        backoff: seconds before the first retry; doubles every retry
+        timeout: socket timeout in seconds
+        max_redirects: number of redirects to follow
+        """
+        self.max_workers = max_workers
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.limiters = {}
+        self.connections = []
+        self.requests = 0
+        #the same threads, and so the same connections, serve every GetAll
+        self.executor = None
+
+    def _Limiter(self, host):
+        with self.lock:
+            if host not in self.limiters:
+                self.limiters[host] = RateLimiter(self.rate)
+            return self.limiters[host]
+
+    def _Connection(self, scheme, netloc):
+        """Gets this thread's connection to a host, opening it if needed."""
+        pool = getattr(self.local, "connections", None)
+        if pool is None:
+            pool = self.local.connections = {}
+        key = scheme, netloc
+        if key not in pool:
+            if scheme == "https":
+                conn = httplib.HTTPSConnection(netloc, timeout=self.timeout)
+            else:
+                conn = httplib.HTTPConnection(netloc, timeout=self.timeout)
+            pool[key] = conn
+            with self.lock:
+                self.connections.append(conn)
+        return pool[key]
+
+    def _Drop(self, scheme, netloc):
+        """Closes this thread's connection to a host."""
+        conn = self.local.connections.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def _Request(self, url):
+        """Makes one request.
+
+        Returns a tuple of (status, location header, body as text)
+        """
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        self._Limiter(parts.netloc).Wait()
+        conn = self._Connection(parts.scheme, parts.netloc)
+        with self.lock:
+            self.requests += 1
+        try:
+            conn.request("GET", path, headers={"Connection": "keep-alive"})
+            response = conn.getresponse()
+            #the body has to be read before the connection can be reused
+            body = response.read()
+        except (httplib.HTTPException, OSError):
+            self._Drop(parts.scheme, parts.netloc)
+            raise
+        if response.will_close:
+            self._Drop(parts.scheme, parts.netloc)
+
+        charset = response.msg.get_content_charset() if hasattr(
+            response.msg, "get_content_charset") else None
+        text = body.decode(charset or "utf-8", "replace")
+        return response.status, response.getheader("Location"), text
+
+    def Get(self, url):
+        """Downloads a page, following redirects and retrying failures.
+
+        url: absolute url
+
+        Returns the page as text
+        """
+        for _ in range(self.max_redirects + 1):
+            for attempt in range(self.retries + 1):
+                try:
+                    status, location, text = self._Request(url)
+                except (httplib.HTTPException, OSError) as e:
+                    error = "%s: %s" % (url, e)
+                else:
+                    if status not in RETRY_STATUSES:
+                        break
+                    error = "%s: HTTP %d" % (url, status)
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2**attempt)
+            else:
+                raise FetchError(error)
+
+            if status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            if status >= 400:
+                raise FetchError("%s: HTTP %d" % (url, status))
+            return text
+
+        raise FetchError("%s: too many redirects" % url)
+
+    def GetAll(self, urls):
+        """Downloads pages concurrently.
+
+        urls: sequence of absolute urls
+
+        Returns a list of pages, in the same order as the urls
+        """
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(self.max_workers)
+        return list(self.executor.map(self.Get, urls))
+
+    def Close(self):
+        """Stops the threads and closes every connection."""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown()
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections = []
+        self.local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.Close()
+
+def fixtureName(url):
+    """Gets the name of the file a FixtureServer serves for a url.
+
+    The path and query of the url are quoted into one file name.
+    """
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return quote(path, safe="")
+
+def saveFixture(directory, url, text):
+    """Saves a page so a FixtureServer can serve it."""
+    filename = os.path.join(directory, fixtureName(url))
+    with open(filename, "wb") as f:
+        f.write(text.encode("utf-8"))
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        server = self.server
+        name = fixtureName(self.path)
+        headers = {}
+        with server.lock:
+            server.requests += 1
+            server.hits[name] = server.hits.get(name, 0) + 1
+            queued = server.responses.get(name)
+            response = queued.pop(0) if queued else None
+
+        if response is not None:
+            status, headers, body = response
+        else:
+            try:
+                with open(os.path.join(server.directory, name), "rb") as f:
+                    body = f.read()
+                status = 200
+            except IOError:
+                body = b"not found"
+                status = 404
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class FixtureServer(object):
+    """Serves saved pages from a directory on localhost.
+
+    Pages are saved with saveFixture.  Use it as a context manager, and
+    pass url_base to the scrapers:
+
+        with FixtureServer("pages") as server:
+            games = scrape_team(team_url, url_base=server.url_base)
+    """
+
+    def __init__(self, directory, port=0):
+        """directory: directory of saved pages
+        port: port to listen on; 0 picks a free one
+        """
+        self.httpd = _ThreadingHTTPServer(("127.0.0.1", port), _FixtureHandler)
+        self.httpd.directory = directory
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = 0
+        self.httpd.connections = 0
+        self.httpd.hits = {}
+        self.httpd.responses = {}
+        self.thread = None
+
+    @property
+    def url_base(self):
+        host, port = self.httpd.server_address[:2]
+        return "http://%s:%d" % (host, port)
+
+    @property
+    def requests(self):
+        """Number of requests served so far."""
+        return self.httpd.requests
+
+    @property
+    def connections(self):
+        """Number of connections opened so far."""
+        return self.httpd.connections
+
+    def Hits(self, url):
+        """Gets the number of requests for a url so far."""
+        return self.httpd.hits.get(fixtureName(url), 0)
+
+    def Respond(self, url, status, location=None, times=1):
+        """Answers the next requests for a url with a status instead of
+        the saved page.
+
+        location: Location header, for redirects
+        times: number of requests to answer this way
+        """
+        headers = {} if location is None else {"Location": location}
+        body = ("HTTP %d" % status).encode("utf-8")
+        with self.httpd.lock:
+            queued = self.httpd.responses.setdefault(fixtureName(url), [])
+            queued.extend([(status, headers, body)] * times)
+
+    def Start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def Stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        return self.Start()
+
+    def __exit__(self, *args):
+        self.Stop()
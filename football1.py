@@ -10,6 +10,8 @@ from __future__ import print_function, division
 import numpy
 import thinkbayes2
 import thinkplot
+from matchup import WinProbability
+from overtime import Overtime
 from scrape import scrape_team
 
 class Football():
@@ -17,9 +19,15 @@ class Football():
     in terms of TDs per game and FGs per games
     """
 
-    def __init__(self, hypos):
-        self.TD = ScoreType(hypos[0])
-        self.FG = ScoreType(hypos[1])
+    def __init__(self, hypos, score_type=None):
+        """hypos: (TD hypotheses, FG hypotheses); arrays of scoring rates
+        for ScoreType, or (shape, rate) pairs for GammaScoreType
+        score_type: class for the scoring rates, ScoreType by default
+        """
+        if score_type is None:
+            score_type = ScoreType
+        self.TD = score_type(hypos[0])
+        self.FG = score_type(hypos[1])
 
     def Update(self, data):
         """Update the child PMFs based on the data.
@@ -41,6 +49,13 @@ class Football():
         """
         self.TD.Update(delta_time)
 
+    def UpdateFromStats(self, stats):
+        """Update the child PMFs based on a whole season at once.
+        stats = dictionary from seasonStats
+        """
+        self.TD.UpdateFromStats(*stats["TD"])
+        self.FG.UpdateFromStats(*stats["FG"])
+
     def PredRemaining(self, rem_time, points_scored):
         """Plots the predictive distribution for final number of goals.
 
@@ -51,6 +66,8 @@ class Football():
         TDpredict = self.TD.PredRemaining(rem_time, 0)
         GoalTotal = FGpredict * 3 + TDpredict * 7
         GoalTotal += points_scored
+        #probability that either count is beyond its Pmf
+        GoalTotal.discarded = 1 - (1 - FGpredict.discarded) * (1 - TDpredict.discarded)
         return GoalTotal
 
 class ScoreType(thinkbayes2.Suite):
@@ -69,24 +86,149 @@ class ScoreType(thinkbayes2.Suite):
         like = thinkbayes2.EvalExponentialPdf(x,lam) #evaluating for every value of lamda
         return like
 
-    def PredRemaining(self, rem_time, score):
+    def VectorLikelihood(self, data, hypos):
+        """Computes the likelihood of the data under every hypothesis.
+
+        hypos: NumPy array of goal scoring rates in goals per game
+        data: time between goals in minutes
+        """
+        lams = hypos / 60.0 #goals per minute
+        return thinkbayes2.EvalExponentialPdf(data, lams)
+
+    def SufficientLogLikelihood(self, stats, hypos):
+        """Computes the log likelihood of many inter-arrival times at once.
+
+        hypos: NumPy array of goal scoring rates in goals per game
+        stats: (number of goals, total time between goals in minutes)
+        """
+        n_events, total_time = stats
+        lams = hypos / 60.0 #goals per minute
+        return thinkbayes2.EvalExponentialLogLikelihood(n_events, total_time, lams)
+
+    def UpdateFromStats(self, n_events, total_time):
+        """Updates with a whole set of inter-arrival times at once.
+
+        Same as calling Update with each time between goals.
+
+        n_events: number of goals
+        total_time: sum of the times between goals in minutes
+        """
+        return self.UpdateSufficient((n_events, total_time))
+
+    def PredRemaining(self, rem_time, score, tol=1e-12):
         """Plots the predictive distribution for final number of goals.
 
         rem_time: remaining time in the game in minutes
         score: number of goals already scored
+        tol: probability to leave out of the tail of each Poisson pmf
+             and of the mixture, or None to cut them all off at 20 goals
+
+        Returns a normalized Pmf; its discarded attribute is the
+        probability of more goals than it covers
         """
-        metapmf=thinkbayes2.Pmf() #PMF about PMFS. probabilities of pmf values
-        for lam, prob in self.Items(): #loop through probabilities of lamdas
-            #print(lam,prob)
-            lt = lam*rem_time/60
-            pmf=thinkbayes2.MakePoissonPmf(lt,20)
-            #thinkplot.Pdf(pmf,linewidth=1,alpha=0.2,color='purple')
-            metapmf[pmf]=prob
-
-        mix = thinkbayes2.MakeMixture(metapmf)
+        lams, probs = self.GetArrays() #probabilities of lamdas
+        #one Poisson pmf per lamda, reused across calls with the same rem_time
+        ks, matrix = thinkbayes2.POISSON_TABLE.Lookup(lams, rem_time/60, 20, tol)
+        mix = thinkbayes2.MakeMixtureMatrix(probs, matrix, ks, tol=tol)
+        high = mix.GetArrays()[0][-1]
         mix += score #shift by 2 because we've already seen 2
+        mix.discarded = float(numpy.dot(probs, thinkbayes2.PoissonTailMass(lams * rem_time/60, high)))
+        return mix
+
+class GammaScoreType(thinkbayes2.Gamma):
+    """Represents the lambda parameter of a Poisson Process to generate
+    scores with a Gamma distribution, the conjugate prior, instead of
+    a grid of hypotheses.
+    """
+
+    def __init__(self, params=(1, 0), label=None):
+        """params: (shape, rate) of the prior, with the rate in games;
+        the default is a flat prior
+        """
+        thinkbayes2.Gamma.__init__(self, params[0], params[1], label)
+
+    def Update(self, data):
+        """Updates the posterior with one time between goals.
+
+        data: time between goals in minutes
+        """
+        thinkbayes2.Gamma.Update(self, (1, data / 60.0))
+
+    def UpdateFromStats(self, n_events, total_time):
+        """Updates with a whole set of inter-arrival times at once.
+
+        n_events: number of goals
+        total_time: sum of the times between goals in minutes
+        """
+        thinkbayes2.Gamma.Update(self, (n_events, total_time / 60.0))
+
+    def PredRemaining(self, rem_time, score):
+        """Plots the predictive distribution for final number of goals.
+
+        The number of goals in the remaining time has a negative binomial
+        distribution, so there is no mixture to compute.
+
+        rem_time: remaining time in the game in minutes
+        score: number of goals already scored
+        """
+        pred = self.PredictivePmf(rem_time / 60.0)
+        mix = pred + score
+        mix.discarded = pred.discarded
         return mix
 
+def seasonStats(games, team):
+    """Computes the statistics the ScoreType updates need from a season.
+    The clock keeps running between games, so the time between scores
+    can span several games.
+
+    games: list of games from scrape_team
+    team: name of the team
+
+    Returns a dictionary that maps from "TD" and "FG" to
+    (number of scores, total time between scores in minutes)
+    """
+    stats = {}
+    for score_type in ["TD", "FG"]:
+        num_scores = 0
+        total_time = 0
+        last_time = 0
+        for game in games:
+            last_time += 60.0
+            for item in game:
+                if item[2] == team and item[1] == score_type:
+                    total_time += last_time - item[0]
+                    last_time = item[0]
+                    num_scores += 1
+        stats[score_type] = (num_scores, total_time)
+    return stats
+
+def buildTeam(games, team):
+    """Constructs an even prior for a team, and then
+    updates it with a season of games
+
+    games: list of games from scrape_team
+    team: name of the team
+
+    Returns a Football object
+    """
+    football = Football((numpy.linspace(0, 20, 201), numpy.linspace(0, 20, 201)))
+    football.UpdateFromStats(seasonStats(games, team))
+    return football
+
+def buildTeamFromStore(store, team, seasons=None):
+    """Constructs an even prior for a team, and then
+    updates it with the games in an event store
+
+    store: eventstore.EventStore
+    team: name of the team
+    seasons: list of seasons to use, all of them by default
+
+    Returns a Football object
+    """
+    football = Football((numpy.linspace(0, 20, 201), numpy.linspace(0, 20, 201)))
+    football.UpdateFromStats(store.TeamStats(team, seasons))
+    return football
+
 def constructPriors():
     """Constructs an even prior for both teams, and then
     uses data from www.covers.com from the 2014 season to
@@ -96,51 +238,8 @@ def constructPriors():
     eagles_url = "/pageLoader/pageLoader.aspx?page=/data/nfl/teams/pastresults/2014-2015/team7.html"
     giants_url = "/pageLoader/pageLoader.aspx?page=/data/nfl/teams/pastresults/2014-2015/team8.html"
 
-    eagles = Football((numpy.linspace(0, 20, 201), numpy.linspace(0, 20, 201)))
-    giants = Football((numpy.linspace(0, 20, 201), numpy.linspace(0, 20, 201)))
-
-    eagles_data = scrape_team(eagles_url)
-    giants_data = scrape_team(giants_url)
-
-    last_time_FG_eagles = 0
-    last_time_TD_eagles = 0
-    for game in eagles_data:
-        last_time_FG_eagles += 60.0
-        last_time_TD_eagles += 60.0
-        for item in game:
-            if item[2] == "Eagles":
-                if item[1] == "FG":
-                    rem_time = item[0]
-                    inter_arrival = last_time_FG_eagles - rem_time
-                    last_time_FG_eagles = rem_time
-
-                    eagles.UpdateFG(inter_arrival)
-                if item[1] == "TD":
-                    rem_time = item[0]
-                    inter_arrival = last_time_TD_eagles - rem_time
-                    last_time_TD_eagles = rem_time
-
-                    eagles.UpdateTD(inter_arrival)
-
-    last_time_FG_giants = 0
-    last_time_TD_giants = 0
-    for game in giants_data:
-        last_time_FG_giants += 60.0
-        last_time_TD_giants += 60.0
-        for item in game:
-            if item[2] == "Giants":
-                if item[1] == "FG":
-                    rem_time = item[0]
-                    inter_arrival = last_time_FG_giants - rem_time
-                    last_time_FG_giants = rem_time
-
-                    giants.UpdateFG(inter_arrival)
-                if item[1] == "TD":
-                    rem_time = item[0]
-                    inter_arrival = last_time_TD_giants - rem_time
-                    last_time_TD_giants = rem_time
-
-                    giants.UpdateTD(inter_arrival)
+    eagles = buildTeam(scrape_team(eagles_url), "Eagles")
+    giants = buildTeam(scrape_team(giants_url), "Giants")
 
     return eagles, giants
 
@@ -154,10 +253,18 @@ def main():
 
     GoalTotalGiants = giants.PredRemaining(60, 0)
     GoalTotalEagles = eagles.PredRemaining(60, 0)
-    print("Giants win", GoalTotalEagles.ProbLess(GoalTotal_giants))
-    print("Eagles win", GoalTotalGiants.ProbLess(GoalTotal_eagles))
-    print(GoalTotalEagles.MakeCdf().CredibleInterval(90))
-    print(GoalTotalGiants.MakeCdf().CredibleInterval(90))
+    eagles_win, giants_win, overtime, spread = WinProbability(
+        eagles, giants, 60, 0, 0, preds=(GoalTotalEagles, GoalTotalGiants))
+    print("Giants win", giants_win)
+    print("Eagles win", eagles_win)
+    print("Overtime", overtime)
+    eagles_final, giants_final, tie = Overtime(eagles, giants).Resolve(eagles_win, giants_win, overtime)
+    print("Giants win after overtime", giants_final)
+    print("Eagles win after overtime", eagles_final)
+    print("Tie after overtime", tie)
+    print("Eagles spread", spread.Mean())
+    print(GoalTotalEagles.CredibleInterval(90))
+    print(GoalTotalGiants.CredibleInterval(90))
 
 if __name__ == '__main__':
     main()
@@ -10,6 +10,8 @@ from __future__ import print_function, division
 import numpy
 import thinkbayes2
 import thinkplot
+from matchup import WinProbability
+from overtime import Overtime
 from scrape import scrape_team
 
 class Football():
@@ -18,9 +20,20 @@ class Football():
     score being a TD.
     """
 
-    def __init__(self, hypos):
-        self.score = ScoreType(hypos[0])
-        self.TDPercent = BooleanEstimator(hypos[1])
+    def __init__(self, hypos, score_type=None, td_type=None):
+        """hypos: (scoring rate hypotheses, TD probability hypotheses);
+        the scoring rates are an array for ScoreType, or a (shape, rate)
+        pair for GammaScoreType; the TD probabilities are an array for
+        BooleanEstimator, or an (alpha, beta) pair for BetaEstimator
+        score_type: class for the scoring rate, ScoreType by default
+        td_type: class for the TD probability, BooleanEstimator by default
+        """
+        if score_type is None:
+            score_type = ScoreType
+        if td_type is None:
+            td_type = BooleanEstimator
+        self.score = score_type(hypos[0])
+        self.TDPercent = td_type(hypos[1])
 
     def Update(self, data):
         """Update the child PMFs based on the data.
@@ -29,6 +42,14 @@ class Football():
         self.score.Update(data[0])
         self.TDPercent.Update(data[1])
 
+    def UpdateFromStats(self, stats):
+        """Update the child PMFs based on a whole season at once.
+        stats = (number of scores, total time between scores, number of TDs)
+        """
+        num_scores, total_time, num_tds = stats
+        self.score.UpdateFromStats(num_scores, total_time)
+        self.TDPercent.UpdateFromStats(num_tds, num_scores - num_tds)
+
     def PredRemaining(self, rem_time, points_scored):
         """Plots the predictive distribution for final number of goals.
 
@@ -36,19 +57,12 @@ class Football():
         points_scored: points already scored
         """
         scorePredict = self.score.PredRemaining(rem_time,0)
-        scorePmf = thinkbayes2.Pmf()
-        for prob_td, prob_p in self.TDPercent.Items():
-            tdProbPmf = thinkbayes2.Pmf()
-            for scores, prob_s in scorePredict.Items():
-                for num_tds in range(scores + 1):
-                    num_fgs = scores - num_tds
-                    points = 7 * num_tds + 3 * num_fgs
-                    ncr = thinkbayes2.BinomialCoef(scores, num_tds)
-                    tdProbPmf.Incr(points, prob_s * ncr * (prob_td**num_tds * (1 - prob_td)**num_fgs))
-            scorePmf.Incr(tdProbPmf, prob_p)
-
-        mix = thinkbayes2.MakeMixture(scorePmf)
+        scores, probs = scorePredict.GetArrays()
+        #probability of each number of TDs, for each number of scores
+        split = self.TDPercent.SplitMatrix(scores)
+        mix = pointsPmf(scores, probs, split)
         mix += points_scored
+        mix.discarded = scorePredict.discarded
         return mix
 
 class BooleanEstimator(thinkbayes2.Suite):
@@ -65,6 +79,53 @@ class BooleanEstimator(thinkbayes2.Suite):
         else:
             return 1 - hypo
 
+    def VectorLikelihood(self, data, hypos):
+        """Computes the likelihood of the data under every hypothesis.
+
+        data: boolean indicating if the event happened
+        hypos: NumPy array of probabilities of the event happening
+        """
+        if data is True:
+            return hypos
+        else:
+            return 1 - hypos
+
+    def SufficientLogLikelihood(self, stats, hypos):
+        """Computes the log likelihood of many booleans at once.
+
+        stats: (number of times the event happened, number of times it didn't)
+        hypos: NumPy array of probabilities of the event happening
+        """
+        num_true, num_false = stats
+        return thinkbayes2.EvalBernoulliLogLikelihood(num_true, num_false, hypos)
+
+    def UpdateFromStats(self, num_true, num_false):
+        """Updates with a whole set of booleans at once.
+
+        num_true: number of times the event happened
+        num_false: number of times the event didn't happen
+        """
+        return self.UpdateSufficient((num_true, num_false))
+
+    def SplitMatrix(self, scores):
+        """Computes the distribution of TDs for each number of scores,
+        mixed over the TD probability hypotheses.
+
+        Given the number of scores, the number of TDs is binomial; this
+        is the same as thinning the Poisson scoring process into
+        independent TD and FG processes.
+
+        scores: NumPy array of numbers of scores
+
+        Returns a matrix where [i, k] is the probability of k TDs
+        given scores[i] scores
+        """
+        ps, weights = self.GetArrays()
+        num_tds = numpy.arange(int(scores.max()) + 1)
+        binom = thinkbayes2.EvalBinomialPmf(num_tds[:, numpy.newaxis],
+                                            scores[:, numpy.newaxis, numpy.newaxis], ps)
+        return numpy.dot(binom, weights)
+
     def PredRemaining(self, rem_time, score):
         """Plots the predictive distribution for final number of goals.
 
@@ -83,6 +144,47 @@ class BooleanEstimator(thinkbayes2.Suite):
         mix += score
         return mix
 
+class BetaEstimator(thinkbayes2.Beta):
+    """Represents a choice between 2 options with a Beta distribution,
+    the conjugate prior, instead of a grid of hypotheses.
+    """
+
+    def __init__(self, params=(1, 1), label=None):
+        """params: (alpha, beta) of the prior; the default is uniform
+        """
+        thinkbayes2.Beta.__init__(self, params[0], params[1], label)
+
+    def Update(self, data):
+        """Updates the posterior with one event.
+
+        data: boolean indicating if the event happened
+        """
+        if data is True:
+            thinkbayes2.Beta.Update(self, (1, 0))
+        else:
+            thinkbayes2.Beta.Update(self, (0, 1))
+
+    def UpdateFromStats(self, num_true, num_false):
+        """Updates with a whole set of booleans at once.
+
+        num_true: number of times the event happened
+        num_false: number of times the event didn't happen
+        """
+        thinkbayes2.Beta.Update(self, (num_true, num_false))
+
+    def SplitMatrix(self, scores):
+        """Computes the distribution of TDs for each number of scores,
+        integrated over the Beta distribution of the TD probability.
+
+        scores: NumPy array of numbers of scores
+
+        Returns a matrix where [i, k] is the beta-binomial probability
+        of k TDs given scores[i] scores
+        """
+        num_tds = numpy.arange(int(scores.max()) + 1)
+        return thinkbayes2.EvalBetaBinomialPmf(num_tds, scores[:, numpy.newaxis],
+                                               self.alpha, self.beta)
+
 class ScoreType(thinkbayes2.Suite):
     """Represents hypotheses about the lambda parameter of a
     Poisson Process to generate scores.
@@ -99,56 +201,182 @@ class ScoreType(thinkbayes2.Suite):
         like = thinkbayes2.EvalExponentialPdf(x,lam) #evaluating for every value of lamda
         return like
 
-    def PredRemaining(self, rem_time, score):
+    def VectorLikelihood(self, data, hypos):
+        """Computes the likelihood of the data under every hypothesis.
+
+        hypos: NumPy array of goal scoring rates in goals per game
+        data: time between goals in minutes
+        """
+        lams = hypos / 60.0 #goals per minute
+        return thinkbayes2.EvalExponentialPdf(data, lams)
+
+    def SufficientLogLikelihood(self, stats, hypos):
+        """Computes the log likelihood of many inter-arrival times at once.
+
+        hypos: NumPy array of goal scoring rates in goals per game
+        stats: (number of goals, total time between goals in minutes)
+        """
+        n_events, total_time = stats
+        lams = hypos / 60.0 #goals per minute
+        return thinkbayes2.EvalExponentialLogLikelihood(n_events, total_time, lams)
+
+    def UpdateFromStats(self, n_events, total_time):
+        """Updates with a whole set of inter-arrival times at once.
+
+        Same as calling Update with each time between goals.
+
+        n_events: number of goals
+        total_time: sum of the times between goals in minutes
+        """
+        return self.UpdateSufficient((n_events, total_time))
+
+    def PredRemaining(self, rem_time, score, tol=1e-12):
         """Plots the predictive distribution for final number of goals.
 
         rem_time: remaining time in the game in minutes
         score: number of goals already scored
-        """
-        metapmf=thinkbayes2.Pmf() #PMF about PMFS. probabilities of pmf values
-        for lam, prob in self.Items(): #loop through probabilities of lamdas
-            lt = lam*rem_time/60
-            pmf=thinkbayes2.MakePoissonPmf(lt,20)
-            metapmf[pmf]=prob
+        tol: probability to leave out of the tail of each Poisson pmf
+             and of the mixture, or None to cut them all off at 20 goals
 
-        mix = thinkbayes2.MakeMixture(metapmf)
+        Returns a normalized Pmf; its discarded attribute is the
+        probability of more goals than it covers
+        """
+        lams, probs = self.GetArrays() #probabilities of lamdas
+        #one Poisson pmf per lamda, reused across calls with the same rem_time
+        ks, matrix = thinkbayes2.POISSON_TABLE.Lookup(lams, rem_time/60, 20, tol)
+        mix = thinkbayes2.MakeMixtureMatrix(probs, matrix, ks, tol=tol)
+        high = mix.GetArrays()[0][-1]
         mix += score
+        mix.discarded = float(numpy.dot(probs, thinkbayes2.PoissonTailMass(lams * rem_time/60, high)))
         return mix
 
-def constructPriors():
-    """Constructs an even prior for both teams, and then
-    uses data from www.covers.com from the 2014 season to
-    update the priors
+class GammaScoreType(thinkbayes2.Gamma):
+    """Represents the lambda parameter of a Poisson Process to generate
+    scores with a Gamma distribution, the conjugate prior, instead of
+    a grid of hypotheses.
     """
 
-    eagles_url = "/pageLoader/pageLoader.aspx?page=/data/nfl/teams/pastresults/2014-2015/team7.html"
-    giants_url = "/pageLoader/pageLoader.aspx?page=/data/nfl/teams/pastresults/2014-2015/team8.html"
+    def __init__(self, params=(1, 0), label=None):
+        """params: (shape, rate) of the prior, with the rate in games;
+        the default is a flat prior
+        """
+        thinkbayes2.Gamma.__init__(self, params[0], params[1], label)
+
+    def Update(self, data):
+        """Updates the posterior with one time between goals.
+
+        data: time between goals in minutes
+        """
+        thinkbayes2.Gamma.Update(self, (1, data / 60.0))
+
+    def UpdateFromStats(self, n_events, total_time):
+        """Updates with a whole set of inter-arrival times at once.
+
+        n_events: number of goals
+        total_time: sum of the times between goals in minutes
+        """
+        thinkbayes2.Gamma.Update(self, (n_events, total_time / 60.0))
+
+    def PredRemaining(self, rem_time, score):
+        """Plots the predictive distribution for final number of goals.
+
+        The number of goals in the remaining time has a negative binomial
+        distribution, so there is no mixture to compute.
+
+        rem_time: remaining time in the game in minutes
+        score: number of goals already scored
+        """
+        pred = self.PredictivePmf(rem_time / 60.0)
+        mix = pred + score
+        mix.discarded = pred.discarded
+        return mix
 
-    eagles = Football((numpy.linspace(0, 20, 201), numpy.linspace(0, 1, 201)))
-    giants = Football((numpy.linspace(0, 20, 201), numpy.linspace(0, 1, 201)))
+def pointsPmf(scores, probs, split):
+    """Computes the distribution of points from the number of scores
+    and how they split into TDs and FGs.
 
-    eagles_data = scrape_team(eagles_url)
-    giants_data = scrape_team(giants_url)
+    scores: NumPy array of numbers of scores
+    probs: NumPy array of their probabilities
+    split: matrix where split[i, k] is the probability of k TDs
+           given scores[i] scores
 
+    Returns a Pmf of points
+    """
+    scores = scores.astype(int)
+    num_tds = numpy.arange(split.shape[1])
+    points = 7 * num_tds + 3 * (scores[:, numpy.newaxis] - num_tds)
+    possible = num_tds <= scores[:, numpy.newaxis]
+
+    weights = probs[:, numpy.newaxis] * split
+    pmf = thinkbayes2.Pmf()
+    pmf.SetArrays(points[possible], weights[possible])
+    return pmf
+
+def seasonStats(games, team):
+    """Computes the statistics the Football updates need from a season.
+    The clock keeps running between games, so the time between scores
+    can span several games.
+
+    games: list of games from scrape_team
+    team: name of the team
+
+    Returns (number of scores, total time between scores in minutes,
+             number of TDs)
+    """
+    num_scores = 0
+    num_tds = 0
+    total_time = 0
     last_time = 0
-    for game in eagles_data:
+    for game in games:
         last_time += 60.0
         for item in game:
-            if item[2] == "Eagles":
-                TD = (item[1] == "TD")
-                inter_arrival = last_time - item[0]
-                eagles.Update((inter_arrival, TD))
+            if item[2] == team:
+                total_time += last_time - item[0]
                 last_time = item[0]
+                num_scores += 1
+                num_tds += (item[1] == "TD")
+    return num_scores, total_time, num_tds
 
-    last_time = 0
-    for game in giants_data:
-        last_time += 60
-        for item in game:
-            if item[2] == "Giants":
-                TD = (item[1] == "TD")
-                inter_arrival = last_time - item[0]
-                giants.Update((inter_arrival, TD))
-                last_time = item[0]
+def buildTeam(games, team):
+    """Constructs an even prior for a team, and then
+    updates it with a season of games
+
+    games: list of games from scrape_team
+    team: name of the team
+
+    Returns a Football object
+    """
+    football = Football((numpy.linspace(0, 20, 201), numpy.linspace(0, 1, 201)))
+    football.UpdateFromStats(seasonStats(games, team))
+    return football
+
+def buildTeamFromStore(store, team, seasons=None):
+    """Constructs an even prior for a team, and then
+    updates it with the games in an event store
+
+    store: eventstore.EventStore
+    team: name of the team
+    seasons: list of seasons to use, all of them by default
+
+    Returns a Football object
+    """
+    football = Football((numpy.linspace(0, 20, 201), numpy.linspace(0, 1, 201)))
+    stats = store.TeamStats(team, seasons)
+    num_scores, total_time = stats["all"]
+    football.UpdateFromStats((num_scores, total_time, stats["TD"][0]))
+    return football
+
+def constructPriors():
+    """Constructs an even prior for both teams, and then
+    uses data from www.covers.com from the 2014 season to
+    update the priors
+    """
+
+    eagles_url = "/pageLoader/pageLoader.aspx?page=/data/nfl/teams/pastresults/2014-2015/team7.html"
+    giants_url = "/pageLoader/pageLoader.aspx?page=/data/nfl/teams/pastresults/2014-2015/team8.html"
+
+    eagles = buildTeam(scrape_team(eagles_url), "Eagles")
+    giants = buildTeam(scrape_team(giants_url), "Giants")
 
     return eagles, giants
 
@@ -162,10 +390,18 @@ def main():
 
     GoalTotalGiants = giants.PredRemaining(60, 0)
     GoalTotalEagles = eagles.PredRemaining(60, 0)
-    print("Giants win", GoalTotalEagles < GoalTotalGiants)
-    print("Eagles win", GoalTotalGiants < GoalTotalEagles)
-    print(GoalTotalEagles.MakeCdf().CredibleInterval(90))
-    print(GoalTotalGiants.MakeCdf().CredibleInterval(90))
+    eagles_win, giants_win, overtime, spread = WinProbability(
+        eagles, giants, 60, 0, 0, preds=(GoalTotalEagles, GoalTotalGiants))
+    print("Giants win", giants_win)
+    print("Eagles win", eagles_win)
+    print("Overtime", overtime)
+    eagles_final, giants_final, tie = Overtime(eagles, giants).Resolve(eagles_win, giants_win, overtime)
+    print("Giants win after overtime", giants_final)
+    print("Eagles win after overtime", eagles_final)
+    print("Tie after overtime", tie)
+    print("Eagles spread", spread.Mean())
+    print(GoalTotalEagles.CredibleInterval(90))
+    print(GoalTotalGiants.CredibleInterval(90))
 
 if __name__ == '__main__':
     main()
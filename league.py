@@ -0,0 +1,187 @@
+"""League-wide matchup matrices.
+
+Builds the posteriors of every team in a league and computes, for one
+game state, the win, overtime and spread summaries of every pairing.
+The matrix is a structured NumPy array saved with numpy.save, so a
+server can memory-map it, with a JSON sidecar that has the team names
+and the game state.
+
+The teams file has one team per line, a name and a covers.com team url
+separated by a comma, for example
+
+    Eagles,/pageLoader/pageLoader.aspx?page=/data/nfl/teams/pastresults/2014-2015/team7.html
+    Giants,/pageLoader/pageLoader.aspx?page=/data/nfl/teams/pastresults/2014-2015/team8.html
+
+The names have to match the names in the box scores.  Blank lines and
+lines that start with # are ignored.
+"""
+
+from __future__ import print_function, division
+
+import argparse
+import importlib
+import json
+import multiprocessing
+
+import numpy
+
+from matchup import CumulativeArrays, ThresholdProbs
+from scrape import scrape_teams
+
+#one record per pairing; the spread is the final margin of the row team
+MATCHUP_DTYPE = numpy.dtype([('win', 'f4'), ('loss', 'f4'), ('overtime', 'f4'),
+                             ('spread_mean', 'f4'), ('spread_low', 'f4'),
+                             ('spread_high', 'f4')])
+
+def readTeams(filename):
+    """Reads a teams file.
+
+    Returns a list of (name, team url) pairs
+    """
+    teams = []
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if line == "" or line.startswith("#"):
+                continue
+            fields = line.split(",", 1)
+            if len(fields) != 2:
+                raise ValueError("Expected 'name,url' in %s: %s" % (filename, line))
+            teams.append((fields[0].strip(), fields[1].strip()))
+    return teams
+
+def buildTeams(teams, model):
+    """Builds the posteriors of a list of teams from their seasons.
+
+    teams: list of (name, team url) pairs
+    model: football1 or football2 module
+
+    Returns a list of Football objects
+    """
+    seasons = scrape_teams([url for _, url in teams])
+    return [model.buildTeam(games, name) for (name, _), games in zip(teams, seasons)]
+
+def matchupSummaries(pred, opponents, margin=0):
+    """Computes the summaries of one team against a list of opponents.
+
+    pred: Pmf of the points the team scores in the rest of the game
+    opponents: list of Pmfs of the points the opponents score
+    margin: current score of the team minus the score of its opponent
+
+    Returns an array of MATCHUP_DTYPE
+    """
+    row = numpy.zeros(len(opponents), dtype=MATCHUP_DTYPE)
+    for j, other in enumerate(opponents):
+        xs, cumulative = CumulativeArrays(pred - other)
+        xs = xs + margin
+        win, loss, overtime = ThresholdProbs(xs, cumulative, 0)
+
+        #probabilities of each value, and the 90% credible interval
+        ps = numpy.diff(cumulative)
+        low, high = numpy.searchsorted(cumulative[1:], [0.05, 0.95])
+        row[j] = win, loss, overtime, numpy.dot(xs, ps), xs[low], xs[high]
+    return row
+
+#predictive Pmfs and margin, set in each worker process
+_preds = None
+_margin = 0
+
+def _initWorker(preds, margin):
+    global _preds, _margin
+    _preds = preds
+    _margin = margin
+
+def _matchupRow(i):
+    return matchupSummaries(_preds[i], _preds, _margin)
+
+def buildMatrix(footballs, rem_time=60, score_a=0, score_b=0, processes=None):
+    """Computes the summaries of every pairing of teams.
+
+    Each team's predictive Pmf is computed once and shared by all of its
+    pairings; the rows of the matrix are spread across a process pool.
+
+    footballs: list of Football objects
+    rem_time: remaining time in the game in minutes
+    score_a: points already scored by the row team
+    score_b: points already scored by the column team
+    processes: size of the pool, 1 to run in this process, or None
+               for one per CPU
+
+    Returns an array of MATCHUP_DTYPE, with one row and column per team
+    """
+    preds = [football.PredRemaining(rem_time, 0) for football in footballs]
+    margin = score_a - score_b
+
+    if processes == 1:
+        _initWorker(preds, margin)
+        rows = [_matchupRow(i) for i in range(len(preds))]
+    else:
+        pool = multiprocessing.Pool(processes, initializer=_initWorker,
+                                    initargs=(preds, margin))
+        try:
+            rows = pool.map(_matchupRow, range(len(preds)))
+        finally:
+            pool.close()
+            pool.join()
+
+    return numpy.stack(rows)
+
+def _basePath(path):
+    if path.endswith(".npy") or path.endswith(".json"):
+        path = path.rsplit(".", 1)[0]
+    return path
+
+def saveMatrix(path, matrix, names, **state):
+    """Saves a matrix as path.npy, and the names and state as path.json.
+
+    matrix: array from buildMatrix
+    names: list of team names, in the order of the rows
+    state: game state and anything else to keep with the matrix
+    """
+    path = _basePath(path)
+    numpy.save(path + ".npy", matrix)
+    meta = dict(state, names=list(names))
+    with open(path + ".json", "w") as f:
+        json.dump(meta, f, indent=1)
+
+def loadMatrix(path):
+    """Loads a matrix saved with saveMatrix, memory-mapped read-only.
+
+    Returns a tuple of (dictionary from the JSON sidecar, matrix)
+    """
+    path = _basePath(path)
+    with open(path + ".json") as f:
+        meta = json.load(f)
+    matrix = numpy.load(path + ".npy", mmap_mode="r")
+    return meta, matrix
+
+def lookupMatchup(meta, matrix, team_a, team_b):
+    """Looks up one pairing in a loaded matrix.
+
+    Returns a record of MATCHUP_DTYPE, from the point of view of team_a
+    """
+    names = meta["names"]
+    return matrix[names.index(team_a), names.index(team_b)]
+
+def main():
+    """Build the matchup matrix for a league and save it."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("teams", help="teams file with one name,url per line")
+    parser.add_argument("output", help="path of the matrix, without extension")
+    parser.add_argument("--model", default="football2", choices=["football1", "football2"])
+    parser.add_argument("--rem-time", type=float, default=60)
+    parser.add_argument("--score-a", type=int, default=0)
+    parser.add_argument("--score-b", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    teams = readTeams(args.teams)
+    model = importlib.import_module(args.model)
+    footballs = buildTeams(teams, model)
+    matrix = buildMatrix(footballs, args.rem_time, args.score_a, args.score_b,
+                         args.processes)
+    saveMatrix(args.output, matrix, [name for name, _ in teams], model=args.model,
+               rem_time=args.rem_time, score_a=args.score_a, score_b=args.score_b)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Live win probabilities for games in progress.
+
+A LiveGame holds the posteriors of both teams, as football1.Football or
+football2.Football objects, and turns a stream of scoring events and
+clock ticks into updated win and overtime probabilities.  The final
+probabilities resolve regulation ties with a sudden-death overtime.
+"""
+
+from __future__ import print_function, division
+
+import collections
+import math
+import numbers
+
+from matchup import CumulativeArrays, OutcomeProbs, SpreadPmf
+from overtime import Overtime
+
+#points for each type of scoring event
+POINTS = {'TD': 7, 'FG': 3}
+
+#win_a, win_b and overtime are at the end of regulation;
+#final_a, final_b and tie are after overtime
+Prediction = collections.namedtuple(
+    'Prediction', ['rem_time', 'score_a', 'score_b', 'win_a', 'win_b', 'overtime',
+                   'final_a', 'final_b', 'tie'])
+
+class LiveGame(object):
+    """Represents a game in progress between two teams.
+
+    The team posteriors are fixed for the whole game, so the distribution
+    of the difference in points scored in the remaining time only depends
+    on the clock.  It is computed once per tick of the clock and cached;
+    after that, an update is a dictionary lookup and a binary search.
+    """
+
+    def __init__(self, team_a, team_b, names=('A', 'B'), length=60, resolution=1,
+                 overtime=None):
+        """team_a, team_b: Football objects with the posteriors of the teams
+        names: names of the teams, as they appear in events
+        length: length of the game in minutes
+        resolution: minutes per tick of the clock; predictions use the
+                    remaining time rounded to a whole number of ticks
+        overtime: overtime.Overtime for the teams; by default, a 10 minute
+                  sudden-death period
+        """
+        if overtime is None:
+            overtime = Overtime(team_a, team_b)
+        self.teams = (team_a, team_b)
+        self.ot = overtime
+        self.names = tuple(names)
+        self.length = length
+        self.resolution = resolution
+        self.rem_time = length
+        self.scores = [0, 0]
+        self.diffs = {}
+
+    def Tick(self, rem_time):
+        """Rounds the remaining time to a whole number of ticks."""
+        rem_time = min(max(rem_time, 0), self.length)
+        return int(round(rem_time / self.resolution))
+
+    def DiffArrays(self, tick):
+        """Gets the distribution of the difference in the rest of the game.
+
+        tick: remaining time, in ticks
+
+        Returns a tuple of (differences, cumulative probabilities),
+        as matchup.CumulativeArrays
+        """
+        try:
+            return self.diffs[tick]
+        except KeyError:
+            pass
+
+        spread = SpreadPmf(self.teams[0], self.teams[1], tick * self.resolution)
+        arrays = self.diffs[tick] = CumulativeArrays(spread)
+        return arrays
+
+    def Precompute(self):
+        """Computes the distributions for every tick of the clock."""
+        for tick in range(self.Tick(self.length) + 1):
+            self.DiffArrays(tick)
+
+    def Predict(self):
+        """Computes the probabilities for the current score and time.
+
+        Returns a Prediction
+        """
+        xs, cumulative = self.DiffArrays(self.Tick(self.rem_time))
+        margin = self.scores[0] - self.scores[1]
+        win_a, win_b, overtime = OutcomeProbs(xs, cumulative, margin)
+        final_a, final_b, tie = self.ot.Resolve(win_a, win_b, overtime)
+        return Prediction(self.rem_time, self.scores[0], self.scores[1],
+                          float(win_a), float(win_b), float(overtime),
+                          float(final_a), float(final_b), float(tie))
+
+    def Apply(self, event):
+        """Applies a scoring event or clock tick, and predicts.
+
+        event: tuple of (remaining time in minutes, event type, team name);
+               the type is 'TD', 'FG', a number of points, or None for a
+               clock tick, which has no team
+
+        Returns a Prediction
+        """
+        rem_time, kind, team = event
+        if math.isnan(rem_time):
+            raise ValueError('Remaining time is NaN.')
+        self.rem_time = min(max(rem_time, 0), self.length)
+
+        if kind is not None:
+            if team not in self.names:
+                raise ValueError('Unknown team: %s' % (team,))
+            points = POINTS.get(kind, kind)
+            if not isinstance(points, numbers.Integral):
+                raise ValueError('Unknown event type: %s' % (kind,))
+            self.scores[self.names.index(team)] += points
+
+        return self.Predict()
+
+    def Stream(self, events):
+        """Generates a prediction for each event.
+
+        events: iterable of events, as Apply takes them
+        """
+        for event in events:
+            yield self.Apply(event)
+
+    async def AsyncStream(self, events):
+        """Generates a prediction for each event from an async iterator.
+
+        events: async iterable of events, as Apply takes them
+        """
+        async for event in events:
+            yield self.Apply(event)
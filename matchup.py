@@ -0,0 +1,150 @@
+"""Win probabilities for a matchup between two teams.
+
+The teams are football1.Football or football2.Football objects; all
+that matters is that they have PredRemaining(rem_time, points_scored).
+"""
+
+from __future__ import print_function, division
+
+import numpy
+
+def SpreadPmf(team_a, team_b, rem_time, preds=None):
+    """Computes the distribution of the points difference in the rest
+    of the game.
+
+    The difference is one lattice correlation of the two predictive
+    distributions (see thinkbayes2.LatticeConvolve).
+
+    team_a, team_b: Football objects
+    rem_time: remaining time in the game in minutes
+    preds: (pred_a, pred_b), the teams' PredRemaining(rem_time, 0) if the
+           caller already has them
+
+    Returns a Pmf of points scored by A minus points scored by B
+    """
+    if preds is None:
+        preds = team_a.PredRemaining(rem_time, 0), team_b.PredRemaining(rem_time, 0)
+    pred_a, pred_b = preds
+    return pred_a - pred_b
+
+def CumulativeArrays(spread):
+    """Gets the arrays OutcomeProbs needs from a spread distribution.
+
+    spread: Pmf of the points difference
+
+    Returns a tuple of (differences, cumulative probabilities), with the
+    probabilities normalized and a leading 0
+    """
+    xs, ps = spread.GetArrays()
+    cumulative = numpy.concatenate([[0.0], numpy.cumsum(ps)])
+    cumulative /= cumulative[-1]
+    return xs, cumulative
+
+def ThresholdProbs(xs, cumulative, lines):
+    """Computes the probabilities of being over, under and at thresholds.
+
+    xs, cumulative: arrays from CumulativeArrays
+    lines: threshold, or NumPy array of thresholds
+
+    Returns a tuple of (P(over), P(under), P(equal))
+    """
+    lines = numpy.asarray(lines)
+    under = cumulative[numpy.searchsorted(xs, lines, side='left')]
+    at_most = cumulative[numpy.searchsorted(xs, lines, side='right')]
+    return 1 - at_most, under, at_most - under
+
+def OutcomeProbs(xs, cumulative, margin):
+    """Computes the probabilities of each outcome of the game.
+
+    xs, cumulative: arrays from CumulativeArrays
+    margin: current score of A minus score of B; can be a NumPy array
+
+    Returns a tuple of (P(A wins), P(B wins), P(overtime))
+    """
+    #A wins if it outscores B by more than its deficit
+    return ThresholdProbs(xs, cumulative, -numpy.asarray(margin))
+
+def WinProbability(team_a, team_b, rem_time, score_a, score_b, preds=None):
+    """Computes the probabilities of each team winning.
+
+    team_a, team_b: Football objects
+    rem_time: remaining time in the game in minutes
+    score_a, score_b: points already scored
+    preds: (pred_a, pred_b), as for SpreadPmf
+
+    Returns a tuple of (P(A wins), P(B wins), P(overtime), Pmf of the
+    final points difference, A minus B)
+    """
+    spread = SpreadPmf(team_a, team_b, rem_time, preds)
+    xs, cumulative = CumulativeArrays(spread)
+    win_a, win_b, overtime = OutcomeProbs(xs, cumulative, score_a - score_b)
+
+    spread += score_a - score_b
+    return float(win_a), float(win_b), float(overtime), spread
+
+def WinProbabilities(team_a, team_b, rem_times, scores_a, scores_b):
+    """Computes the probabilities of each team winning for many game states.
+
+    The spread distribution is computed once per distinct remaining time.
+
+    team_a, team_b: Football objects
+    rem_times: array of remaining times in minutes
+    scores_a, scores_b: arrays of points already scored
+
+    Returns a tuple of arrays (P(A wins), P(B wins), P(overtime))
+    """
+    rem_times, scores_a, scores_b = numpy.broadcast_arrays(rem_times, scores_a, scores_b)
+    margins = scores_a - scores_b
+
+    win_a = numpy.empty(rem_times.shape)
+    win_b = numpy.empty(rem_times.shape)
+    overtime = numpy.empty(rem_times.shape)
+    for rem_time in numpy.unique(rem_times):
+        same = rem_times == rem_time
+        xs, cumulative = CumulativeArrays(SpreadPmf(team_a, team_b, rem_time))
+        win_a[same], win_b[same], overtime[same] = OutcomeProbs(xs, cumulative, margins[same])
+
+    return win_a, win_b, overtime
+
+class LinePricer(object):
+    """Prices point spreads and totals for a matchup.
+
+    The distributions of the final margin and the final total are
+    computed once; after that, a vector of lines is priced with one
+    binary search per line.
+    """
+
+    def __init__(self, team_a, team_b, rem_time=60, score_a=0, score_b=0):
+        """team_a, team_b: Football objects
+        rem_time: remaining time in the game in minutes
+        score_a, score_b: points already scored
+        """
+        pred_a = team_a.PredRemaining(rem_time, score_a)
+        pred_b = team_b.PredRemaining(rem_time, score_b)
+        self.margin = CumulativeArrays(pred_a - pred_b)
+        self.total = CumulativeArrays(pred_a + pred_b)
+
+    def Moneyline(self):
+        """Returns a tuple of (P(A wins), P(B wins), P(overtime))."""
+        win_a, win_b, overtime = ThresholdProbs(self.margin[0], self.margin[1], 0)
+        return float(win_a), float(win_b), float(overtime)
+
+    def Spreads(self, lines):
+        """Prices point spreads.
+
+        A covers a spread of -3.5 when the final margin is over 3.5.
+
+        lines: thresholds for the final margin, A minus B; can be a NumPy array
+
+        Returns a tuple of (P(A covers), P(B covers), P(push))
+        """
+        return ThresholdProbs(self.margin[0], self.margin[1], lines)
+
+    def Totals(self, lines):
+        """Prices over/unders.
+
+        lines: thresholds for the final total; can be a NumPy array
+
+        Returns a tuple of (P(over), P(under), P(push))
+        """
+        return ThresholdProbs(self.total[0], self.total[1], lines)
@@ -0,0 +1,91 @@
+"""Sudden-death overtime.
+
+In sudden death, the first team to score wins.  Given scoring rates
+lam_a and lam_b, in scores per game, the probability that A scores
+first within an overtime period of T minutes is
+
+    lam_a / (lam_a + lam_b) * (1 - exp(-(lam_a + lam_b) * T / 60))
+
+The probabilities here integrate that over the posteriors of both
+teams.  Since any score ends the game, only the total scoring rate of
+a team matters; the split into TDs and FGs drops out.
+"""
+
+from __future__ import print_function, division
+
+import numpy
+
+import thinkbayes2
+
+def _asPmf(dist):
+    """Gets a Pmf of scoring rates from a ScoreType or GammaScoreType."""
+    if isinstance(dist, thinkbayes2.Gamma):
+        return dist.MakePmf()
+    return dist
+
+def ratePmf(football):
+    """Computes the distribution of a team's total scoring rate.
+
+    football: football1.Football or football2.Football
+
+    Returns a Pmf of scores per game
+    """
+    if hasattr(football, 'TDPercent'):
+        #football2: one scoring process
+        return _asPmf(football.score)
+
+    #football1: TDs and FGs are independent processes, so the rates add
+    return _asPmf(football.TD) + _asPmf(football.FG)
+
+def SuddenDeath(rate_a, rate_b, length=10):
+    """Computes the probabilities of each outcome of a sudden-death period.
+
+    rate_a, rate_b: Pmfs of the scoring rates of the teams, in scores per game
+    length: length of the period in minutes
+
+    Returns a tuple of (P(A wins), P(B wins), P(nobody scores))
+    """
+    lams_a, ps_a = rate_a.GetArrays()
+    lams_b, ps_b = rate_b.GetArrays()
+    lams_a = lams_a[:, numpy.newaxis]
+
+    total = lams_a + lams_b
+    #probability that anybody scores, and that A scores first if so
+    scores = -numpy.expm1(-total * length / 60)
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        share_a = numpy.where(total > 0, lams_a / total, 0.0)
+
+    weights = numpy.outer(ps_a / ps_a.sum(), ps_b / ps_b.sum())
+    win_a = numpy.sum(weights * share_a * scores)
+    win_b = numpy.sum(weights * (1 - share_a) * scores)
+    return float(win_a), float(win_b), float(1 - win_a - win_b)
+
+class Overtime(object):
+    """Represents the outcome of overtime between two teams.
+
+    The probabilities only depend on the posteriors, so they are computed
+    once; resolving a tie is then a few multiplications.
+    """
+
+    def __init__(self, team_a, team_b, length=10, rates=None):
+        """team_a, team_b: Football objects
+        length: length of the overtime period in minutes
+        rates: (rate_a, rate_b), the teams' ratePmfs if the caller
+               already has them
+        """
+        self.length = length
+        if rates is None:
+            rates = ratePmf(team_a), ratePmf(team_b)
+        self.win_a, self.win_b, self.tie = SuddenDeath(rates[0], rates[1], length)
+
+    def Resolve(self, win_a, win_b, overtime):
+        """Folds the regulation ties into the final outcome.
+
+        win_a, win_b, overtime: probabilities at the end of regulation;
+                                can be NumPy arrays
+
+        Returns a tuple of (P(A wins), P(B wins), P(tie after overtime))
+        """
+        return (win_a + overtime * self.win_a,
+                win_b + overtime * self.win_b,
+                overtime * self.tie)
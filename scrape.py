@@ -1,5 +1,10 @@
-import os
+import collections
 import datetime
+import re
+
+from cache import PageCache
+from extract import select, selectRows
+from fetch import Fetcher
 
 exceptions = { "Bears 23Eagles 28": ((23, 28), (15 + 6 + 4 / 60.0, "TD", "Bears")),
                "Bears 31Eagles 28": ((31, 28), (15 + 1 + 29 / 60.0, "TD", "Bears")),
@@ -12,6 +17,35 @@ quarter_times = {"1st Quarter": 45, "2nd Quarter": 30,
                  "3rd Quarter": 15, "4th Quarter": 0 }
 games_in_season = 5
 games_to_ignore = 1
+site_url = "http://www.covers.com"
+#team pages gain games during a season, so they're refetched after a while
+team_page_max_age = 12 * 60 * 60
+
+_fetcher = None
+_cache = None
+
+#one game from ingest; teams is (team, opponent), the teams the game counts
+#for, with the opponent None if unknown or outside its own window
+Game = collections.namedtuple('Game', ['season', 'week', 'date', 'url', 'teams', 'events'])
+
+_season_re = re.compile(r"/(\d{4}-\d{4})/")
+_date_re = re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4}|\d{2})\b")
+
+def default_fetcher():
+    """Gets the Fetcher the scrapers share when none is passed in.
+    """
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = Fetcher()
+    return _fetcher
+
+def default_cache():
+    """Gets the PageCache the scrapers share when none is passed in.
+    """
+    global _cache
+    if _cache is None:
+        _cache = PageCache()
+    return _cache
 
 def main():
     """Scrape a given team url, and print the results
@@ -23,34 +57,229 @@ def main():
     print(games)
 
 
-def scrape_team(team_url):
+def scrape_team(team_url, url_base=None, fetcher=None, cache=None):
     """Scrape a team url from www.covers.com.
-    Uses pup to process html.
+    Downloads the box scores concurrently.
+
+    url_base: site to scrape, by default www.covers.com
+    fetcher: fetch.Fetcher to download with, by default a shared one
+    cache: cache.PageCache to keep pages and box scores in, by default
+           a shared one; False to not cache
+
     Returns a list of games from scrape_box_score
     """
-    url_base = "http://www.covers.com"
-    url = url_base + team_url
-    output = os.popen("curl " + url + " | " +
-                    "pup table.data td.datacell a attr{href}")
+    return scrape_teams([team_url], url_base, fetcher, cache)[0]
+
+def scrape_teams(team_urls, url_base=None, fetcher=None, cache=None):
+    """Scrape several team urls from www.covers.com.
+    All the team pages are downloaded concurrently, then all the box scores.
+    Box scores that are already in the cache aren't downloaded or parsed.
+
+    Returns a list with the games of each team, as scrape_team
+    """
+    if url_base is None:
+        url_base = site_url
+    if fetcher is None:
+        fetcher = default_fetcher()
+    if cache is None:
+        cache = default_cache()
+
+    pages = get_pages([url_base + team_url for team_url in team_urls], fetcher,
+                      cache, team_page_max_age)
+    team_box_urls = [box_score_urls(page, url_base) for page in pages]
+
+    #one flat batch of box scores, so every download runs concurrently
+    urls = sorted(set(url for box_urls in team_box_urls for url in box_urls))
+    games = dict(zip(urls, get_box_scores(urls, fetcher, cache)))
+    return [[games[url] for url in box_urls] for box_urls in team_box_urls]
+
+def get_box_scores(urls, fetcher, cache):
+    """Gets the scoring events of box scores, from the cache when they're
+    there, and otherwise by downloading them concurrently and parsing them.
+
+    Returns a list of games, in the same order as the urls
+    """
+    games = [cache.GetEvents(url) if cache else None for url in urls]
+    missing = [i for i, events in enumerate(games) if events is None]
+    for i, page in zip(missing, get_pages([urls[i] for i in missing], fetcher, cache)):
+        games[i] = parse_box_score(page)
+        if cache:
+            cache.PutEvents(urls[i], games[i])
+    return games
+
+def get_pages(urls, fetcher, cache, max_age=None):
+    """Gets pages from the cache, downloading the ones that aren't there.
+
+    max_age: maximum age of a cached page in seconds, or None
+
+    Returns a list of pages, in the same order as the urls
+    """
+    if not cache:
+        return fetcher.GetAll(urls)
+    pages = [cache.GetPage(url, max_age) for url in urls]
+    missing = [i for i, page in enumerate(pages) if page is None]
+    for i, page in zip(missing, fetcher.GetAll([urls[i] for i in missing])):
+        cache.PutPage(urls[i], page)
+        pages[i] = page
+    return pages
+
+def box_score_urls(page, url_base):
+    """Finds the box scores to scrape on a team page.
+    Returns a list of urls
+    """
     urls = []
-    for line in output:
+    for line in select(page, "table.data td.datacell a attr{href}"):
         if "boxscore" in line:
             urls.append(url_base + line.strip())
+    return urls[games_to_ignore:games_to_ignore + games_in_season]
 
+def scrape_box_score(url, fetcher=None, cache=None):
+    """Scrape a box score url from www.covers.com.
+    Returns a list of scoring events, as parse_box_score
+    """
+    if fetcher is None:
+        fetcher = default_fetcher()
+    if cache is None:
+        cache = default_cache()
+    return get_box_scores([url], fetcher, cache)[0]
+
+def team_season(team_url):
+    """Gets the season of a team url, a string like "2014-2015".
+    """
+    match = _season_re.search(team_url)
+    if not match:
+        raise ValueError("No season in team url: %s" % team_url)
+    return match.group(1)
+
+def season_url(team_url, season):
+    """Changes the season of a team url.
+
+    season: string like "2014-2015"
+    """
+    team_season(team_url)
+    return _season_re.sub("/%s/" % season, team_url, count=1)
+
+def team_schedule(page, url_base):
+    """Finds every game on a team page that has a box score.
+    Returns a list of (week, date or None, box score url), where the
+    weeks count the team's games from 1, so they skip its bye
+    """
     games = []
-    for url in urls[games_to_ignore:]:
-        if len(games) >= games_in_season:
-            break
-        games.append(scrape_box_score(url))
+    for text, links in selectRows(page, "table.data tr"):
+        urls = [link.strip() for link in links if "boxscore" in link]
+        if not urls:
+            continue
+        date = None
+        match = _date_re.search(text)
+        if match:
+            month, day, year = [int(field) for field in match.groups()]
+            try:
+                date = datetime.date(year + 2000 if year < 100 else year, month, day)
+            except ValueError:
+                pass
+        games.append((len(games) + 1, date, url_base + urls[0]))
     return games
 
-def scrape_box_score(url):
-    """Scrape a team url from www.covers.com.
-    Uses pup to process html.
+def in_window(week, date, weeks, dates):
+    """Checks whether a game is inside the week and date windows.
+    A game without a date is outside any date window.
+    """
+    if weeks is not None and not weeks[0] <= week <= weeks[1]:
+        return False
+    if dates is not None and (date is None or not dates[0] <= date <= dates[1]):
+        return False
+    return True
+
+def ingest(teams, seasons=None, weeks=None, dates=None, url_base=None,
+           fetcher=None, cache=None, batch_size=32):
+    """Streams the games of a set of teams over a set of seasons.
+
+    All the team pages of a season are read first, so a game between two
+    of the teams is downloaded and parsed once.  Then the box scores are
+    downloaded in batches, and the games are yielded in the order they
+    were played: by date when the team pages have dates, otherwise by week.
+
+    The windows are checked against each team's own schedule, so a game
+    can be inside one team's window and outside the other's, which has
+    a different week number after a bye.  Such a game only counts for
+    the team whose window it's in: the other team is never its opponent.
+
+    teams: list of (name, team url) pairs, as from league.readTeams
+    seasons: list of seasons like "2014-2015", put into the team urls;
+             by default, each team url is read for the season already
+             in it; either way, a team url without a season is an error
+    weeks: (first, last) weeks, inclusive, as counted by team_schedule
+    dates: (first, last) datetime.dates, inclusive
+    Without either window, the games are the ones scrape_team uses.
+    batch_size: number of box scores to download at a time
+
+    Yields Game tuples
+    """
+    if url_base is None:
+        url_base = site_url
+    if fetcher is None:
+        fetcher = default_fetcher()
+    if cache is None:
+        cache = default_cache()
+    if weeks is None and dates is None:
+        weeks = (games_to_ignore + 1, games_to_ignore + games_in_season)
+
+    if seasons is None:
+        season_teams = collections.OrderedDict()
+        for name, url in sorted(teams, key=lambda team: team_season(team[1])):
+            season_teams.setdefault(team_season(url), []).append((name, url))
+    else:
+        season_teams = collections.OrderedDict(
+            (season, [(name, season_url(url, season)) for name, url in teams])
+            for season in seasons)
+
+    for season, season_urls in season_teams.items():
+        pages = get_pages([url_base + url for _, url in season_urls], fetcher, cache,
+                          team_page_max_age)
+
+        #each game in the windows, with the teams whose windows it's in
+        games = collections.OrderedDict()
+        for (name, _), page in zip(season_urls, pages):
+            for week, date, box_url in team_schedule(page, url_base):
+                if not in_window(week, date, weeks, dates):
+                    continue
+                if box_url not in games:
+                    games[box_url] = (week, date, box_url, [])
+                games[box_url][3].append(name)
+        del pages
+        ingested = set(name for name, _ in season_urls)
+
+        order = sorted(games.values(),
+                       key=lambda game: (game[1] or datetime.date.max, game[0]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            box_scores = get_box_scores([game[2] for game in batch], fetcher, cache)
+            for (week, date, box_url, names), events in zip(batch, box_scores):
+                yield _make_game(season, week, date, box_url, names, events, ingested)
+
+def _make_game(season, week, date, box_url, names, events, ingested):
+    """Makes a Game for the teams whose windows it's in.
+
+    names: the ingested teams whose windows have the game
+    ingested: all the ingested teams; an opponent found from the events
+              is left out when it's one of them, since then the game is
+              outside its window
+    """
+    if len(names) > 1:
+        teams = (names[0], names[1])
+    else:
+        others = [event[2] for event in events
+                  if event[2] != names[0] and event[2] not in ingested]
+        teams = (names[0], others[0] if others else None)
+    return Game(season, week, date, box_url, teams, events)
+
+def parse_box_score(page):
+    """Parse a box score page from www.covers.com.
+    Extracts the same text pup would print for "table.num-left text{}".
     Returns a list of scoring events, which have the form:
         (time left in game, scoring type, team that scored)
     """
-    html = os.popen("curl " + url + " | pup table.num-left text{}")
+    html = select(page, "table.num-left text{}")
     filtered = []
     for line in html:
         line = line.strip(" \t\n")
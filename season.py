@@ -0,0 +1,314 @@
+"""Simulates the rest of a season and the playoff seeding.
+
+The league file is a CSV file with a header and one row per team:
+
+    team,conference,division,wins,losses,ties
+    Eagles,NFC,East,3,1,0
+
+The schedule file is a CSV file with a header and one row per remaining
+game; the order of the teams doesn't matter, since the models have no
+home field advantage:
+
+    team_a,team_b
+    Eagles,Giants
+
+The win probability of each distinct matchup is computed once, from the
+predictive distributions of the teams and a sudden-death overtime; the
+seasons are then simulated in vectorized chunks.  Each conference seeds
+its division winners first, by record, then the wild cards; remaining
+ties are broken at random.
+"""
+
+from __future__ import print_function, division
+
+import argparse
+import collections
+import csv
+import importlib
+import multiprocessing
+
+import numpy
+
+import thinkbayes2
+from league import buildTeams, readTeams
+from matchup import CumulativeArrays, OutcomeProbs
+from overtime import Overtime, ratePmf
+
+SeasonResult = collections.namedtuple(
+    'SeasonResult', ['n', 'names', 'wins', 'seeds', 'playoffs', 'division'])
+
+def readLeague(filename):
+    """Reads a league file.
+
+    Returns a list of dictionaries, one per team
+    """
+    with open(filename) as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        for field in ["wins", "losses", "ties"]:
+            row[field] = int(row[field])
+    return rows
+
+def readSchedule(filename, names):
+    """Reads a schedule file.
+
+    names: list of team names
+
+    Returns a NumPy array of team indices, with one row per game
+    """
+    games = []
+    with open(filename) as f:
+        for row in csv.DictReader(f):
+            for field in ["team_a", "team_b"]:
+                if row[field] not in names:
+                    raise ValueError("Unknown team in %s: %s" % (filename, row[field]))
+            games.append((names.index(row["team_a"]), names.index(row["team_b"])))
+    return numpy.array(games, dtype=int).reshape(-1, 2)
+
+class MatchupCache(object):
+    """Caches the final outcome probabilities of matchups.
+
+    Each team's predictive Pmf for a whole game and its scoring rate
+    Pmf are computed once, and each pair of teams is resolved once,
+    including overtime.
+    """
+
+    def __init__(self, footballs, ot_length=10):
+        """footballs: list of Football objects
+        ot_length: length of overtime in minutes
+        """
+        self.footballs = footballs
+        self.ot_length = ot_length
+        self.preds = {}
+        self.rates = {}
+        self.probs = {}
+
+    def Pred(self, i):
+        """Gets the predictive Pmf of points for team i."""
+        if i not in self.preds:
+            self.preds[i] = self.footballs[i].PredRemaining(60, 0)
+        return self.preds[i]
+
+    def Rate(self, i):
+        """Gets the Pmf of the total scoring rate of team i."""
+        if i not in self.rates:
+            self.rates[i] = ratePmf(self.footballs[i])
+        return self.rates[i]
+
+    def Probs(self, i, j):
+        """Gets the probabilities for a game between teams i and j.
+
+        Returns a tuple of (P(i wins), P(j wins), P(tie))
+        """
+        if (j, i) in self.probs:
+            win_j, win_i, tie = self.probs[j, i]
+            return win_i, win_j, tie
+        if (i, j) not in self.probs:
+            xs, cumulative = CumulativeArrays(self.Pred(i) - self.Pred(j))
+            regulation = OutcomeProbs(xs, cumulative, 0)
+            ot = Overtime(self.footballs[i], self.footballs[j], self.ot_length,
+                          rates=(self.Rate(i), self.Rate(j)))
+            self.probs[i, j] = tuple(float(p) for p in ot.Resolve(*regulation))
+        return self.probs[i, j]
+
+def matchupProbabilities(footballs, schedule, ot_length=10):
+    """Computes the probabilities of every game in a schedule.
+
+    footballs: list of Football objects
+    schedule: array from readSchedule
+
+    Returns a NumPy array with one row of (P(A wins), P(B wins), P(tie))
+    per game
+    """
+    cache = MatchupCache(footballs, ot_length)
+    return numpy.array([cache.Probs(i, j) for i, j in schedule]).reshape(-1, 3)
+
+def seedTeams(score, conferences, divisions, num_seeds=7):
+    """Seeds the playoffs in a batch of simulated seasons.
+
+    score: array with one row per season and one column per team;
+           higher is better and there are no ties
+    conferences: array with the conference of each team
+    divisions: array with the division of each team
+    num_seeds: playoff teams per conference
+
+    Returns an int array like score, with each team's seed or 0
+    """
+    size = score.shape[0]
+    rows = numpy.arange(size)[:, numpy.newaxis]
+    seeds = numpy.zeros(score.shape, dtype=int)
+
+    for conference in numpy.unique(conferences):
+        members = numpy.flatnonzero(conferences == conference)
+        divs = numpy.unique(divisions[members])
+        if num_seeds < len(divs):
+            raise ValueError("Fewer seeds than divisions in %s" % conference)
+
+        #division winners get the top seeds, in order of record
+        winners = numpy.empty((size, len(divs)), dtype=int)
+        for k, div in enumerate(divs):
+            teams = numpy.flatnonzero(divisions == div)
+            winners[:, k] = teams[numpy.argmax(score[:, teams], axis=1)]
+        order = numpy.argsort(-numpy.take_along_axis(score, winners, axis=1), axis=1)
+        winners = numpy.take_along_axis(winners, order, axis=1)
+        seeds[rows, winners] = numpy.arange(1, len(divs) + 1)
+
+        #then the best of the rest
+        num_wild = min(num_seeds, len(members)) - len(divs)
+        rest = numpy.where(seeds[:, members] > 0, -numpy.inf, score[:, members])
+        wild = members[numpy.argsort(-rest, axis=1)[:, :num_wild]]
+        seeds[rows, wild] = numpy.arange(len(divs) + 1, len(divs) + num_wild + 1)
+
+    return seeds
+
+class Season(object):
+    """Represents the rest of a season."""
+
+    def __init__(self, league, schedule, probs, num_seeds=7):
+        """league: list of dictionaries from readLeague
+        schedule: array from readSchedule
+        probs: array from matchupProbabilities
+        num_seeds: playoff teams per conference
+        """
+        self.names = [row["team"] for row in league]
+        self.num_seeds = num_seeds
+        num_teams = len(league)
+
+        confs = [row["conference"] for row in league]
+        divs = [(row["conference"], row["division"]) for row in league]
+        self.conferences = numpy.array([sorted(set(confs)).index(c) for c in confs])
+        self.divisions = numpy.array([sorted(set(divs)).index(d) for d in divs])
+        #division winners take the first seeds of their conference
+        self.division_seeds = [len(set(d for d in divs if d[0] == c)) for c in confs]
+
+        self.wins = numpy.array([row["wins"] for row in league])
+        self.ties = numpy.array([row["ties"] for row in league])
+        self.games = self.wins + self.ties + numpy.array([row["losses"] for row in league])
+
+        #one column per team, with a 1 in the rows of its games
+        self.team_a = numpy.zeros((len(schedule), num_teams))
+        self.team_b = numpy.zeros((len(schedule), num_teams))
+        self.team_a[numpy.arange(len(schedule)), schedule[:, 0]] = 1
+        self.team_b[numpy.arange(len(schedule)), schedule[:, 1]] = 1
+        self.games += (self.team_a + self.team_b).sum(axis=0).astype(int)
+
+        self.cutoffs = numpy.cumsum(probs[:, :2], axis=1)
+        self.max_wins = self.games.max()
+
+    def SimulateChunk(self, size, rng):
+        """Simulates a batch of seasons.
+
+        size: number of seasons
+        rng: numpy.random.Generator
+
+        Returns a tuple of count arrays, with one row per team and one
+        column per number of wins, and per seed
+        """
+        u = rng.random((size, len(self.cutoffs)))
+        a_wins = u < self.cutoffs[:, 0]
+        b_wins = (u >= self.cutoffs[:, 0]) & (u < self.cutoffs[:, 1])
+        ties = ~(a_wins | b_wins)
+
+        wins = self.wins + numpy.rint(numpy.dot(a_wins, self.team_a) +
+                                      numpy.dot(b_wins, self.team_b)).astype(int)
+        all_ties = self.ties + numpy.rint(numpy.dot(ties, self.team_a + self.team_b))
+        pct = (wins + all_ties / 2) / numpy.maximum(self.games, 1)
+
+        #random tiebreaks, smaller than any difference in records
+        score = pct + rng.random(pct.shape) * 1e-6
+        seeds = seedTeams(score, self.conferences, self.divisions, self.num_seeds)
+
+        return (_histogram(wins, self.max_wins + 1),
+                _histogram(seeds, self.num_seeds + 1))
+
+    def Simulate(self, n=10000, seed=None, chunk_size=2000, processes=1):
+        """Simulates the rest of the season many times.
+
+        n: number of seasons
+        seed: int seed for thinkbayes2.RandomGenerators, or None
+        chunk_size: number of seasons per chunk; the results depend on it
+        processes: size of the pool, 1 to run in this process, or None
+                   for one per CPU
+
+        Returns a SeasonResult, with one row per team of the probability
+        of each number of wins, of each seed (0 for no playoffs), of
+        making the playoffs, and of winning the division
+        """
+        if n <= 0:
+            raise ValueError("n must be positive, not %r" % n)
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive, not %r" % chunk_size)
+        num_chunks = -(-n // chunk_size)
+        sizes = [chunk_size] * (num_chunks - 1) + [n - chunk_size * (num_chunks - 1)]
+        tasks = list(zip(sizes, thinkbayes2.RandomGenerators(seed, num_chunks)))
+
+        if processes == 1:
+            _initWorker(self)
+            results = [_simulateChunk(task) for task in tasks]
+        else:
+            pool = multiprocessing.Pool(processes, initializer=_initWorker,
+                                        initargs=(self,))
+            try:
+                results = pool.map(_simulateChunk, tasks)
+            finally:
+                pool.close()
+                pool.join()
+
+        wins = sum(result[0] for result in results) / n
+        seeds = sum(result[1] for result in results) / n
+        division = numpy.array([seeds[i, 1:k + 1].sum()
+                                for i, k in enumerate(self.division_seeds)])
+        return SeasonResult(n, self.names, wins, seeds, 1 - seeds[:, 0], division)
+
+def _histogram(values, width):
+    """Counts the values in each column of a batch.
+
+    Returns an array with one row per column and one column per value
+    """
+    num_teams = values.shape[1]
+    index = values + width * numpy.arange(num_teams)
+    counts = numpy.bincount(index.ravel(), minlength=num_teams * width)
+    return counts.reshape(num_teams, width)
+
+#season, set in each worker process
+_season = None
+
+def _initWorker(season):
+    global _season
+    _season = season
+
+def _simulateChunk(args):
+    size, rng = args
+    return _season.SimulateChunk(size, rng)
+
+def main():
+    """Simulate the rest of a season and print the playoff chances."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("teams", help="teams file with one name,url per line")
+    parser.add_argument("league", help="CSV file of conferences, divisions and records")
+    parser.add_argument("schedule", help="CSV file of remaining games")
+    parser.add_argument("--model", default="football2", choices=["football1", "football2"])
+    parser.add_argument("-n", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    league = readLeague(args.league)
+    names = [row["team"] for row in league]
+    urls = dict(readTeams(args.teams))
+    footballs = buildTeams([(name, urls[name]) for name in names],
+                           importlib.import_module(args.model))
+
+    schedule = readSchedule(args.schedule, names)
+    probs = matchupProbabilities(footballs, schedule)
+    result = Season(league, schedule, probs).Simulate(args.n, args.seed,
+                                                      processes=args.processes)
+
+    print("%-12s %6s %8s %8s %8s" % ("team", "wins", "playoffs", "division", "seed 1"))
+    for i, name in enumerate(result.names):
+        mean_wins = numpy.dot(result.wins[i], numpy.arange(result.wins.shape[1]))
+        print("%-12s %6.1f %8.3f %8.3f %8.3f" % (name, mean_wins, result.playoffs[i],
+                                                 result.division[i], result.seeds[i, 1]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Monte Carlo simulation of games, as an alternative to the exact
+predictive distributions.
+
+Each simulated game draws the parameters of both teams from their
+posteriors and then the points they score in the remaining time.  The
+teams are football1.Football or football2.Football objects, with grid
+or conjugate posteriors.
+
+Simulations run in chunks, each with its own random Generator spawned
+from one seed, so the results only depend on the seed, not on how the
+chunks are spread across processes.
+"""
+
+from __future__ import print_function, division
+
+import collections
+import multiprocessing
+
+import numpy
+
+import thinkbayes2
+
+SimResult = collections.namedtuple(
+    'SimResult', ['n', 'win_a', 'win_b', 'overtime', 'win_a_se', 'win_b_se',
+                  'overtime_se', 'spread_mean', 'spread_mean_se',
+                  'spread', 'score_a', 'score_b'])
+
+def sampleParam(dist, size, rng):
+    """Draws parameters from a posterior distribution.
+
+    dist: thinkbayes2.Gamma, thinkbayes2.Beta, or a Suite of hypotheses
+    size: number of draws
+    rng: numpy.random.Generator
+
+    Returns a NumPy array
+    """
+    if isinstance(dist, thinkbayes2.Gamma):
+        dist._CheckProper()
+        return rng.gamma(dist.alpha, 1.0 / dist.beta, size)
+    if isinstance(dist, thinkbayes2.Beta):
+        return rng.beta(dist.alpha, dist.beta, size)
+
+    xs, ps = dist.GetArrays()
+    return rng.choice(xs, size, p=ps / ps.sum())
+
+def samplePoints(football, rem_time, size, rng):
+    """Draws the points a team scores in the rest of the game.
+
+    Only the number of scores matters, not when they happen, so the
+    Poisson counts are drawn directly instead of the scoring times.
+
+    football: football1.Football or football2.Football
+    rem_time: remaining time in the game in minutes
+    size: number of games
+    rng: numpy.random.Generator
+
+    Returns a NumPy array of points
+    """
+    games = rem_time / 60
+    if hasattr(football, 'TDPercent'):
+        #football2: one scoring process, and each score is a TD with prob p_TD
+        scores = rng.poisson(sampleParam(football.score, size, rng) * games)
+        tds = rng.binomial(scores, sampleParam(football.TDPercent, size, rng))
+        return 7 * tds + 3 * (scores - tds)
+
+    #football1: independent TD and FG processes
+    tds = rng.poisson(sampleParam(football.TD, size, rng) * games)
+    fgs = rng.poisson(sampleParam(football.FG, size, rng) * games)
+    return 7 * tds + 3 * fgs
+
+def _counts(values):
+    return numpy.unique(values, return_counts=True)
+
+def simulateChunk(team_a, team_b, rem_time, score_a, score_b, size, rng):
+    """Simulates one chunk of games.
+
+    Returns a tuple of (values, counts) pairs for the final scores of
+    A and B and the final margin, and the sum of squared margins
+    """
+    points_a = score_a + samplePoints(team_a, rem_time, size, rng)
+    points_b = score_b + samplePoints(team_b, rem_time, size, rng)
+    margins = points_a - points_b
+    return (_counts(points_a), _counts(points_b), _counts(margins),
+            float(numpy.dot(margins, margins)))
+
+#teams and game state, set in each worker process
+_game = None
+
+def _initWorker(game):
+    global _game
+    _game = game
+
+def _simulateChunk(args):
+    size, rng = args
+    return simulateChunk(*(_game + (size, rng)))
+
+def _makeHist(pairs):
+    hist = thinkbayes2.Hist()
+    for values, counts in pairs:
+        for value, count in zip(values.tolist(), counts.tolist()):
+            hist.Incr(value, count)
+    return hist
+
+def Simulate(team_a, team_b, rem_time=60, score_a=0, score_b=0,
+             n=1000000, seed=None, chunk_size=100000, processes=1):
+    """Simulates games between two teams.
+
+    team_a, team_b: Football objects
+    rem_time: remaining time in the game in minutes
+    score_a, score_b: points already scored
+    n: number of games
+    seed: int seed for thinkbayes2.RandomGenerators, or None
+    chunk_size: number of games per chunk; the results depend on it
+    processes: size of the pool, 1 to run in this process, or None
+               for one per CPU
+
+    Returns a SimResult; the _se fields are Monte Carlo standard errors
+    """
+    if n <= 0:
+        raise ValueError("n must be positive, not %r" % n)
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive, not %r" % chunk_size)
+    num_chunks = -(-n // chunk_size)
+    sizes = [chunk_size] * (num_chunks - 1) + [n - chunk_size * (num_chunks - 1)]
+    tasks = list(zip(sizes, thinkbayes2.RandomGenerators(seed, num_chunks)))
+    game = (team_a, team_b, rem_time, score_a, score_b)
+
+    if processes == 1:
+        _initWorker(game)
+        results = [_simulateChunk(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(processes, initializer=_initWorker,
+                                    initargs=(game,))
+        try:
+            results = pool.map(_simulateChunk, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    hists = [_makeHist(result[i] for result in results) for i in range(3)]
+    score_a_hist, score_b_hist, spread_hist = hists
+    sum_squares = sum(result[3] for result in results)
+
+    win_a = sum(count for x, count in spread_hist.Items() if x > 0) / n
+    win_b = sum(count for x, count in spread_hist.Items() if x < 0) / n
+    overtime = spread_hist.Freq(0) / n
+    spread_mean = sum(x * count for x, count in spread_hist.Items()) / n
+    spread_var = sum_squares / n - spread_mean**2
+
+    def StdErr(p):
+        return numpy.sqrt(p * (1 - p) / n)
+
+    return SimResult(n, win_a, win_b, overtime,
+                     StdErr(win_a), StdErr(win_b), StdErr(overtime),
+                     spread_mean, numpy.sqrt(spread_var / n),
+                     thinkbayes2.Pmf(spread_hist), thinkbayes2.Pmf(score_a_hist),
+                     thinkbayes2.Pmf(score_b_hist))
@@ -0,0 +1,73 @@
+"""Tests for the on-disk page cache."""
+
+from __future__ import print_function, division
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import scrape
+from cache import CacheMiss, PageCache
+
+BOX_SCORE = """<table class="num-left">
+<tr><td>1st Quarter</td><td>10:21</td><td>PHI - Sproles 5 yd run TD</td></tr>
+<tr><td>Eagles 7</td><td>Giants 0</td></tr>
+<tr><td>4th Quarter</td><td>3:05</td><td>NYG - Brown 40 yd FG</td></tr>
+<tr><td>Eagles 7</td><td>Giants 3</td></tr>
+</table>"""
+
+class PageCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def Age(self, cache, kind, url, seconds):
+        """Makes an entry look like it was fetched some time ago."""
+        path = cache._Path(kind, url)
+        then = time.time() - seconds
+        os.utime(path, (then, then))
+
+    def testReadDoesNotRefreshAge(self):
+        cache = PageCache(self.directory)
+        cache.PutPage("http://a/team", "page")
+        self.Age(cache, "html", "http://a/team", 3600)
+        self.assertEqual(cache.GetPage("http://a/team", 2 * 3600), "page")
+        self.Age(cache, "html", "http://a/team", 3 * 3600)
+        self.assertEqual(cache.GetPage("http://a/team", 4 * 3600), "page")
+        #the reads above must not have made the page look newer
+        self.assertIsNone(cache.GetPage("http://a/team", 2 * 3600))
+
+    def testEvictsLeastRecentlyUsed(self):
+        cache = PageCache(self.directory, max_bytes=None)
+        for name in "abc":
+            cache.PutPage("http://a/" + name, name * 100)
+            self.Age(cache, "html", "http://a/" + name, 100)
+        cache.GetPage("http://a/a")
+        cache.max_bytes = 250
+        cache.Evict()
+        self.assertEqual(cache.GetPage("http://a/a"), "a" * 100)
+        self.assertEqual(cache.Stats()["entries"], 2)
+
+    def testOfflineIgnoresAge(self):
+        PageCache(self.directory).PutPage("http://a/team", "page")
+        offline = PageCache(self.directory, offline=True)
+        self.Age(offline, "html", "http://a/team", 13 * 3600)
+        self.assertEqual(offline.GetPage("http://a/team", 12 * 3600), "page")
+        self.assertRaises(CacheMiss, offline.GetPage, "http://a/other")
+
+    def testOfflineParsesCachedPage(self):
+        url = "http://a/boxscore1"
+        PageCache(self.directory).PutPage(url, BOX_SCORE)
+        offline = PageCache(self.directory, offline=True)
+        events = scrape.scrape_box_score(url, cache=offline)
+        self.assertEqual(events, scrape.parse_box_score(BOX_SCORE))
+        self.assertRaises(CacheMiss, scrape.scrape_box_score, "http://a/boxscore2",
+                          cache=offline)
+
+if __name__ == '__main__':
+    unittest.main()
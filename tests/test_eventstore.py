@@ -0,0 +1,141 @@
+"""Tests for the EventStore."""
+
+from __future__ import print_function, division
+
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import football1
+import football2
+from eventstore import EVENT_DTYPE, EventStore, appendRecords, gameKey
+
+#two seasons of games, as from scrape_team, in the order they were played
+SEASONS = {
+    "2013": [
+        [(50.5, "TD", "Eagles"), (31.25, "FG", "Giants"), (2.75, "TD", "Eagles")],
+        #the Giants didn't score in this one
+        [(44.0, "FG", "Eagles")],
+        [(58.5, "FG", "Giants"), (20.0, "TD", "Giants"), (0.5, "FG", "Eagles")],
+    ],
+    "2014": [
+        #nobody scored
+        [],
+        [(12.25, "TD", "Giants"), (11.0, "TD", "Eagles")],
+    ],
+}
+
+def boxScoreUrl(season, i):
+    return "/boxscore/%s/%d.html" % (season, i)
+
+class EventStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def AddAll(self, store, team):
+        for season, games in sorted(SEASONS.items()):
+            urls = [boxScoreUrl(season, i) for i in range(len(games))]
+            store.AddTeamGames(season, team, games, urls)
+
+    def testAppendAcrossFlushes(self):
+        games = SEASONS["2013"]
+        for i, events in enumerate(games):
+            store = EventStore(self.directory)
+            store.AddTeamGames("2013", "Eagles", [events], [boxScoreUrl("2013", i)])
+            store.Flush()
+
+        store = EventStore(self.directory)
+        self.assertEqual(store.Seasons(), ["2013"])
+        self.assertEqual(sorted(store.teams), ["Eagles", "Giants"])
+        self.assertEqual(store.Games("2013")["key"].tolist(),
+                         [gameKey(boxScoreUrl("2013", i)) for i in range(3)])
+        events = store.Events("2013")
+        self.assertEqual(events["game"].tolist(), [0, 0, 0, 1, 2, 2, 2])
+        self.assertEqual(events["rem_time"].tolist(),
+                         [event[0] for game in games for event in game])
+        self.assertEqual(events["points"].tolist(), [7, 3, 7, 3, 3, 7, 3])
+
+    def testAppendRecords(self):
+        #the shape grows by several digits, so the header has to stretch
+        path = self.directory + "/records.npy"
+        sizes = [1, 9, 90, 900, 9000]
+        for i, size in enumerate(sizes):
+            records = np.zeros(size, dtype=EVENT_DTYPE)
+            records["game"] = i
+            appendRecords(path, records)
+        records = np.load(path)
+        self.assertEqual(records.dtype, EVENT_DTYPE)
+        self.assertEqual(np.bincount(records["game"]).tolist(), sizes)
+        self.assertRaises(ValueError, appendRecords, path, np.zeros(1))
+
+    def testDuplicatesAreSkipped(self):
+        with EventStore(self.directory) as store:
+            self.AddAll(store, "Eagles")
+        with EventStore(self.directory) as store:
+            self.AddAll(store, "Giants")
+            self.AddAll(store, "Eagles")
+            self.assertEqual(store.new_games, {})
+
+        store = EventStore(self.directory)
+        self.assertEqual(len(store.Games("2013")), 3)
+        self.assertEqual(len(store.Events("2013")), 7)
+        self.assertEqual(len(store.Games("2014")), 2)
+
+    def testFillOpponent(self):
+        with EventStore(self.directory) as store:
+            self.AddAll(store, "Eagles")
+            #the Giants scored in neither of these
+            self.assertEqual(store.new_games["2013"][1][2], -1)
+            self.assertEqual(store.new_games["2014"][0][2], -1)
+            store.AddTeamGames("2013", "Giants", [SEASONS["2013"][1]],
+                               [boxScoreUrl("2013", 1)])
+            self.assertEqual(store.new_games["2013"][1][2], store.TeamId("Giants"))
+
+        #and again, after the game is on disk
+        store = EventStore(self.directory)
+        store.AddTeamGames("2014", "Giants", [[]], [boxScoreUrl("2014", 0)])
+        eagles, giants = store.TeamId("Eagles"), store.TeamId("Giants")
+        self.assertEqual(store.Games("2014")[["team_a", "team_b"]].tolist(),
+                         [(eagles, giants), (eagles, giants)])
+        self.assertEqual(store.new_games, {})
+
+    def testTeamStats(self):
+        with EventStore(self.directory) as store:
+            self.AddAll(store, "Eagles")
+            self.AddAll(store, "Giants")
+
+        store = EventStore(self.directory)
+        games = SEASONS["2013"] + SEASONS["2014"]
+        for team in ["Eagles", "Giants"]:
+            stats = store.TeamStats(team, ["2013", "2014"])
+            for kind, (num_scores, total_time) in football1.seasonStats(games, team).items():
+                self.assertEqual(stats[kind][0], num_scores)
+                self.assertAlmostEqual(stats[kind][1], total_time, places=3)
+
+            num_scores, total_time, num_tds = football2.seasonStats(games, team)
+            self.assertEqual(stats["all"][0], num_scores)
+            self.assertAlmostEqual(stats["all"][1], total_time, places=3)
+            self.assertEqual(stats["TD"][0], num_tds)
+
+    def testStatsOfOneSeason(self):
+        with EventStore(self.directory) as store:
+            self.AddAll(store, "Eagles")
+            self.AddAll(store, "Giants")
+
+        store = EventStore(self.directory)
+        stats = store.Stats(["2014"])
+        for team in ["Eagles", "Giants"]:
+            expected = football1.seasonStats(SEASONS["2014"], team)
+            i = store.TeamId(team)
+            for kind in ["TD", "FG"]:
+                self.assertEqual(stats[kind][0][i], expected[kind][0])
+                self.assertTrue(np.isclose(stats[kind][1][i], expected[kind][1]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+"""Tests for the Fetcher, run against a FixtureServer."""
+
+from __future__ import print_function, division
+
+import datetime
+import shutil
+import tempfile
+import time
+import unittest
+
+import football2
+import scrape
+from eventstore import EventStore
+from fetch import FetchError, Fetcher, FixtureServer, saveFixture
+
+BOX_SCORE = """<table class="num-left">
+<tr><td>1st Quarter</td><td>10:21</td><td>PHI - Sproles 5 yd run TD</td></tr>
+<tr><td>Eagles 7</td><td>Giants 0</td></tr>
+<tr><td>4th Quarter</td><td>%d:05</td><td>NYG - Brown 40 yd FG</td></tr>
+<tr><td>Eagles 7</td><td>Giants 3</td></tr>
+</table>"""
+
+TEAM_URL = "/pageLoader/pageLoader.aspx?page=/data/nfl/teams/pastresults/2014-2015/team7.html"
+
+def boxScoreUrl(i):
+    return "/pageLoader/pageLoader.aspx?page=/data/nfl/results/2014-2015/boxscore%d.html" % i
+
+def teamPage(games):
+    """Makes a team page listing games, given as (day in September, box score id)."""
+    rows = "".join('<tr><td class="datacell">09/%02d/13<td class="datacell">'
+                   '<a href="/boxscore?id=%d">W</a>' % game for game in games)
+    return '<table class="data">%s</table>' % rows
+
+class FetcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for i in range(20):
+            saveFixture(self.directory, "/page%d" % i, "page %d" % i)
+        self.server = FixtureServer(self.directory).Start()
+        self.base = self.server.url_base
+
+    def tearDown(self):
+        self.server.Stop()
+        shutil.rmtree(self.directory)
+
+    def testGetAllKeepsOrderAndReusesConnections(self):
+        urls = [self.base + "/page%d" % i for i in range(20)]
+        with Fetcher(max_workers=4, rate=None) as fetcher:
+            pages = fetcher.GetAll(urls)
+            pages += fetcher.GetAll(urls)
+        self.assertEqual(pages, ["page %d" % i for i in range(20)] * 2)
+        self.assertEqual(self.server.requests, 40)
+        self.assertLessEqual(self.server.connections, 4)
+
+    def testRetriesWithBackoff(self):
+        url = self.base + "/page1"
+        self.server.Respond(url, 500)
+        self.server.Respond(url, 429)
+        start = time.time()
+        with Fetcher(rate=None, retries=3, backoff=0.05) as fetcher:
+            self.assertEqual(fetcher.Get(url), "page 1")
+        self.assertEqual(self.server.Hits(url), 3)
+        #backoff of 0.05, then 0.1
+        self.assertGreaterEqual(time.time() - start, 0.15)
+
+    def testGivesUpAfterRetries(self):
+        url = self.base + "/page2"
+        self.server.Respond(url, 503, times=5)
+        with Fetcher(rate=None, retries=2, backoff=0.01) as fetcher:
+            self.assertRaises(FetchError, fetcher.Get, url)
+        self.assertEqual(self.server.Hits(url), 3)
+
+    def testDoesNotRetryNotFound(self):
+        url = self.base + "/missing"
+        with Fetcher(rate=None, retries=3, backoff=0.01) as fetcher:
+            self.assertRaises(FetchError, fetcher.Get, url)
+        self.assertEqual(self.server.Hits(url), 1)
+
+    def testFollowsRedirects(self):
+        self.server.Respond(self.base + "/old", 301, location="/page3")
+        self.server.Respond(self.base + "/page3", 302, location=self.base + "/page4")
+        with Fetcher(rate=None) as fetcher:
+            self.assertEqual(fetcher.Get(self.base + "/old"), "page 4")
+        self.assertEqual(self.server.Hits(self.base + "/page4"), 1)
+
+    def testTooManyRedirects(self):
+        self.server.Respond(self.base + "/loop", 302, location="/loop", times=10)
+        with Fetcher(rate=None, max_redirects=3) as fetcher:
+            self.assertRaises(FetchError, fetcher.Get, self.base + "/loop")
+        self.assertEqual(self.server.Hits(self.base + "/loop"), 4)
+
+    def testRateLimit(self):
+        urls = [self.base + "/page%d" % i for i in range(6)]
+        start = time.time()
+        with Fetcher(max_workers=6, rate=20) as fetcher:
+            fetcher.GetAll(urls)
+        #the first request goes right away, the other five 1/20 s apart
+        self.assertGreaterEqual(time.time() - start, 5 / 20)
+
+class ScrapeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        links = "".join('<tr><td class="datacell"><a href="%s">W</a></td></tr>'
+                        % boxScoreUrl(i) for i in range(8))
+        saveFixture(self.directory, TEAM_URL, '<table class="data">%s</table>' % links)
+        for i in range(8):
+            saveFixture(self.directory, boxScoreUrl(i), BOX_SCORE % i)
+        self.server = FixtureServer(self.directory).Start()
+        self.fetcher = Fetcher(rate=None, backoff=0.01)
+
+    def tearDown(self):
+        self.fetcher.Close()
+        self.server.Stop()
+        shutil.rmtree(self.directory)
+
+    def Expected(self, i):
+        return scrape.parse_box_score(BOX_SCORE % i)
+
+    def testScrapeTeam(self):
+        #one box score fails once, and is retried
+        self.server.Respond(self.server.url_base + boxScoreUrl(3), 500)
+        games = scrape.scrape_team(TEAM_URL, self.server.url_base, self.fetcher, cache=False)
+        first = scrape.games_to_ignore
+        last = first + scrape.games_in_season
+        self.assertEqual(games, [self.Expected(i) for i in range(first, last)])
+        #the team page, the box scores, and the retry
+        self.assertEqual(self.server.requests, 1 + scrape.games_in_season + 1)
+
+    def testGetBoxScoresKeepsOrder(self):
+        urls = [self.server.url_base + boxScoreUrl(i) for i in [5, 0, 7, 2]]
+        games = scrape.get_box_scores(urls, self.fetcher, False)
+        self.assertEqual(games, [self.Expected(i) for i in [5, 0, 7, 2]])
+
+class IngestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        #box score urls without a season in them
+        saveFixture(self.directory, "/teams/2013-2014/team7.html",
+                    teamPage([(7, 0), (14, 1), (21, 2)]))
+        #the Giants played game 3 first, so their weeks are one later
+        saveFixture(self.directory, "/teams/2013-2014/team8.html",
+                    teamPage([(1, 3), (7, 0), (14, 1), (21, 2)]))
+        for i in range(4):
+            saveFixture(self.directory, "/boxscore?id=%d" % i, BOX_SCORE % i)
+        self.server = FixtureServer(self.directory).Start()
+        self.fetcher = Fetcher(rate=None)
+
+    def tearDown(self):
+        self.fetcher.Close()
+        self.server.Stop()
+        shutil.rmtree(self.directory)
+
+    def Ingest(self, teams, **options):
+        return list(scrape.ingest(teams, url_base=self.server.url_base,
+                                  fetcher=self.fetcher, cache=False, **options))
+
+    def testSeasonFromTeamUrl(self):
+        games = self.Ingest([("Eagles", "/teams/2013-2014/team7.html")], weeks=(1, 3))
+        self.assertEqual([game.season for game in games], ["2013-2014"] * 3)
+        self.assertEqual([game.teams for game in games], [("Eagles", "Giants")] * 3)
+
+    def Hits(self, i):
+        return self.server.Hits(self.server.url_base + "/boxscore?id=%d" % i)
+
+    def testSharedGamesOnce(self):
+        teams = [("Eagles", "/teams/2013-2014/team7.html"),
+                 ("Giants", "/teams/2013-2014/team8.html")]
+        dates = (datetime.date(2013, 9, 7), datetime.date(2013, 9, 21))
+        games = self.Ingest(teams, dates=dates)
+        self.assertEqual([game.url for game in games],
+                         [self.server.url_base + "/boxscore?id=%d" % i for i in range(3)])
+        self.assertEqual([game.teams for game in games], [("Eagles", "Giants")] * 3)
+        self.assertEqual([self.Hits(i) for i in range(4)], [1, 1, 1, 0])
+
+    def testWindowsPerTeam(self):
+        teams = [("Eagles", "/teams/2013-2014/team7.html"),
+                 ("Giants", "/teams/2013-2014/team8.html")]
+        games = self.Ingest(teams, weeks=(2, 3))
+        #weeks 2 and 3 are games 1 and 2 for the Eagles, 0 and 1 for the Giants
+        self.assertEqual([game.teams for game in games],
+                         [("Giants", None), ("Eagles", "Giants"), ("Eagles", None)])
+        self.assertEqual([self.Hits(i) for i in range(4)], [1, 1, 1, 0])
+
+        store = EventStore(self.directory + "/store")
+        store.AddGames(games)
+        store.Flush()
+        events = [game.events for game in games]
+        num_scores, total_time, num_tds = football2.seasonStats(events[:2], "Giants")
+        self.assertEqual(store.TeamStats("Giants")["all"][0], num_scores)
+        self.assertAlmostEqual(store.TeamStats("Giants")["all"][1], total_time, places=3)
+        num_scores, total_time, num_tds = football2.seasonStats(events[1:], "Eagles")
+        self.assertEqual(store.TeamStats("Eagles")["all"][0], num_scores)
+        self.assertAlmostEqual(store.TeamStats("Eagles")["all"][1], total_time, places=3)
+
+    def testTeamUrlWithoutSeason(self):
+        self.assertRaises(ValueError, self.Ingest, [("Eagles", "/teams/team7.html")])
+
+if __name__ == '__main__':
+    unittest.main()
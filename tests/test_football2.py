@@ -0,0 +1,79 @@
+"""Tests for the vectorized predictions of football2."""
+
+from __future__ import print_function, division
+
+import unittest
+
+import numpy as np
+
+import thinkbayes2
+from football2 import BetaEstimator, BooleanEstimator, Football, pointsPmf
+
+def LoopPointsRemaining(football, rem_time):
+    """The original Football.PredRemaining: one binomial split per TD
+    probability hypothesis and number of scores.
+
+    Returns a Pmf of the number of points in the remaining time
+    """
+    scorePredict = football.score.PredRemaining(rem_time, 0)
+    scorePmf = thinkbayes2.Pmf()
+    for prob_td, prob_p in football.TDPercent.Items():
+        tdProbPmf = thinkbayes2.Pmf()
+        for scores, prob_s in scorePredict.Items():
+            for num_tds in range(scores + 1):
+                num_fgs = scores - num_tds
+                points = 7 * num_tds + 3 * num_fgs
+                ncr = thinkbayes2.BinomialCoef(scores, num_tds)
+                tdProbPmf.Incr(points, prob_s * ncr *
+                               (prob_td**num_tds * (1 - prob_td)**num_fgs))
+        scorePmf.Incr(tdProbPmf, prob_p)
+    return thinkbayes2.MakeMixture(scorePmf)
+
+class PointsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.football = Football((np.linspace(0, 20, 201), np.linspace(0, 1, 101)))
+        self.football.UpdateFromStats((40, 600, 24))
+
+    def testPredRemainingMatchesLoops(self):
+        for rem_time in [60, 25.5, 3]:
+            expected = LoopPointsRemaining(self.football, rem_time)
+            pmf = self.football.PredRemaining(rem_time, 0)
+            self.assertEqual(pmf.Values(), sorted(expected.Values()))
+            for x, p in pmf.Items():
+                self.assertAlmostEqual(p, expected.Prob(x), places=15)
+
+    def testSplitMatrix(self):
+        scores = np.arange(8)
+        split = self.football.TDPercent.SplitMatrix(scores)
+        probs, weights = self.football.TDPercent.GetArrays()
+        for n in scores:
+            for k in range(split.shape[1]):
+                expected = 0
+                if k <= n:
+                    expected = np.dot(weights, thinkbayes2.BinomialCoef(n, k) *
+                                      probs**k * (1 - probs)**(n - k))
+                self.assertAlmostEqual(split[n, k], expected, places=15)
+
+    def testBetaSplitMatrix(self):
+        #a fine grid of TD probabilities approximates the Beta distribution
+        beta = BetaEstimator((25, 17))
+        grid = BooleanEstimator(np.linspace(0, 1, 2001))
+        grid.UpdateFromStats(24, 16)
+        scores = np.arange(8)
+        split = beta.SplitMatrix(scores)
+        self.assertTrue(np.allclose(split.sum(axis=1), 1))
+        self.assertTrue(np.allclose(split, grid.SplitMatrix(scores), atol=1e-5))
+
+    def testPointsPmf(self):
+        scores = np.array([0, 1, 2])
+        probs = np.array([0.5, 0.3, 0.2])
+        split = np.array([[1, 0, 0], [0.4, 0.6, 0], [0.16, 0.48, 0.36]])
+        pmf = pointsPmf(scores, probs, split)
+        expected = {0: 0.5, 3: 0.12, 7: 0.18, 6: 0.032, 10: 0.096, 14: 0.072}
+        self.assertEqual(pmf.Values(), sorted(expected))
+        for x, p in expected.items():
+            self.assertAlmostEqual(pmf.Prob(x), p)
+
+if __name__ == '__main__':
+    unittest.main()
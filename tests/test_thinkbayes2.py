@@ -0,0 +1,196 @@
+"""Tests for thinkbayes2."""
+
+from __future__ import print_function, division
+
+import math
+import unittest
+
+import numpy as np
+
+import thinkbayes2
+
+class Rate(thinkbayes2.Suite):
+    """Exponential waiting times with an unknown rate."""
+
+    def Likelihood(self, data, hypo):
+        return hypo * math.exp(-hypo * data)
+
+    def LogLikelihood(self, data, hypo):
+        return math.log(hypo) - hypo * data if hypo else -np.inf
+
+DATA = [0.1, 0.05, 0.2, 0.12, 0.08, 0.15]
+
+class StorageTest(unittest.TestCase):
+
+    def Means(self, update):
+        means = []
+        for storage in ['dict', 'array', 'log']:
+            suite = Rate(np.linspace(0, 20, 201), storage=storage)
+            update(suite)
+            means.append(suite.Mean())
+        return means
+
+    def testLogUpdateSet(self):
+        def update(suite):
+            suite.Log()
+            suite.LogUpdateSet(DATA)
+            suite.Exp()
+            suite.Normalize()
+        dict_mean, array_mean, log_mean = self.Means(update)
+        self.assertAlmostEqual(dict_mean, array_mean)
+        self.assertAlmostEqual(dict_mean, log_mean)
+
+    def testLogUpdateWithoutTransform(self):
+        def update(suite):
+            if suite.IsLogStorage():
+                suite.LogUpdateSet(DATA)
+                suite.Normalize()
+            else:
+                suite.UpdateSet(DATA)
+        dict_mean, array_mean, log_mean = self.Means(update)
+        self.assertAlmostEqual(dict_mean, array_mean)
+        self.assertAlmostEqual(dict_mean, log_mean)
+
+    def testUpdateSet(self):
+        dict_mean, array_mean, log_mean = self.Means(lambda suite: suite.UpdateSet(DATA))
+        self.assertAlmostEqual(dict_mean, array_mean)
+        self.assertAlmostEqual(dict_mean, log_mean)
+
+class ArrayStorageTest(unittest.TestCase):
+
+    def testSetWidensValues(self):
+        pmf = thinkbayes2.Pmf(np.array([1, 2, 3]))
+        pmf.Set(2.5, 0.7)
+        self.assertEqual(pmf.Values(), [1, 2, 2.5, 3])
+        self.assertEqual(pmf.Prob(2.5), 0.7)
+        self.assertAlmostEqual(pmf.Prob(2), 1 / 3)
+
+    def testIncrWidensValues(self):
+        hist = thinkbayes2.Hist(np.array([1, 2, 2, 3]))
+        hist.Incr(1.5)
+        self.assertEqual(hist.Items(), [(1, 1), (1.5, 1), (2, 2), (3, 1)])
+
+    def testIncrWidensStrings(self):
+        hist = thinkbayes2.Hist(np.array(['a', 'bb']))
+        hist.Incr('cccc')
+        self.assertEqual(hist.Items(), [('a', 1), ('bb', 1), ('cccc', 1)])
+        self.assertEqual(hist.Freq('cccc'), 1)
+
+class TruncationTest(unittest.TestCase):
+
+    def testMixtureIsNormalized(self):
+        lams = np.linspace(0.5, 8, 16)
+        weights = np.ones(len(lams)) / len(lams)
+        ks, matrix = thinkbayes2.MakePoissonMatrix(lams, 40)
+        mix = thinkbayes2.MakeMixtureMatrix(weights, matrix, ks, tol=1e-9)
+        self.assertAlmostEqual(mix.Total(), 1, places=12)
+        self.assertGreater(mix.discarded, 0)
+        self.assertLessEqual(mix.discarded, 1e-9)
+
+    def testPoissonDiscarded(self):
+        pmf = thinkbayes2.MakePoissonPmf(3.0, tol=1e-9)
+        self.assertAlmostEqual(pmf.Total(), 1, places=12)
+        high = pmf.GetArrays()[0][-1]
+        self.assertAlmostEqual(pmf.discarded, thinkbayes2.PoissonTailMass(3.0, high))
+        self.assertLessEqual(pmf.discarded, 1e-9)
+
+def LoopConvolve(pmf1, pmf2, subtract=False):
+    """The pairwise loop that LatticeConvolve replaces.
+
+    Returns a dictionary that maps from values to probabilities
+    """
+    d = {}
+    for v1, p1 in pmf1.Items():
+        for v2, p2 in pmf2.Items():
+            v = v1 - v2 if subtract else v1 + v2
+            d[v] = d.get(v, 0) + p1 * p2
+    return d
+
+def RandomPmf(rng, values, size):
+    """Makes a Pmf on a random subset of values, with random probabilities."""
+    xs = np.sort(rng.choice(values, size, replace=False))
+    pmf = thinkbayes2.Pmf()
+    pmf.SetArrays(xs, rng.random(size))
+    pmf.Normalize()
+    return pmf
+
+class LatticeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(17)
+
+    def Check(self, pmf1, pmf2, subtract):
+        pmf = thinkbayes2.LatticeConvolve(pmf1, pmf2, subtract)
+        self.assertIsNotNone(pmf)
+        expected = LoopConvolve(pmf1, pmf2, subtract)
+        self.assertEqual(pmf.Values(), sorted(expected))
+        xs, ps = pmf.GetArrays()
+        self.assertTrue(np.allclose(ps, [expected[x] for x in xs.tolist()],
+                                    rtol=0, atol=1e-15))
+
+    def testScores(self):
+        #multiples of 3 and 7, like the score Pmfs in football1
+        fgs = thinkbayes2.MakePoissonPmf(2.0, 20) * 3
+        tds = thinkbayes2.MakePoissonPmf(2.5, 20) * 7
+        self.Check(fgs, tds, subtract=False)
+        self.Check(fgs, tds, subtract=True)
+
+    def testIntegers(self):
+        for i in range(10):
+            pmf1 = RandomPmf(self.rng, np.arange(-20, 60), 30)
+            pmf2 = RandomPmf(self.rng, np.arange(0, 40), 20)
+            self.Check(pmf1, pmf2, subtract=False)
+            self.Check(pmf1, pmf2, subtract=True)
+
+    def testHalves(self):
+        for i in range(10):
+            pmf1 = RandomPmf(self.rng, np.arange(0, 40, 0.5), 30)
+            pmf2 = RandomPmf(self.rng, np.arange(-10, 10, 1.5), 10)
+            self.Check(pmf1, pmf2, subtract=False)
+            self.Check(pmf1, pmf2, subtract=True)
+
+    def testLong(self):
+        #long enough to use the FFT
+        n = thinkbayes2.FFT_MIN_LENGTH + 100
+        pmf1 = RandomPmf(self.rng, np.arange(n), n)
+        pmf2 = RandomPmf(self.rng, np.arange(n), n)
+        self.Check(pmf1, pmf2, subtract=False)
+        self.Check(pmf1, pmf2, subtract=True)
+
+    def testNotOnLattice(self):
+        pmf1 = thinkbayes2.Pmf(np.linspace(0, 1, 20) ** 2)
+        pmf2 = thinkbayes2.Pmf(np.sqrt(np.arange(20)))
+        self.assertIsNone(thinkbayes2.LatticeConvolve(pmf1, pmf2))
+
+class PmfCompareTest(unittest.TestCase):
+
+    def Loop(self, pmf1, pmf2):
+        less, equal, greater = 0.0, 0.0, 0.0
+        for v1, p1 in pmf1.Items():
+            for v2, p2 in pmf2.Items():
+                if v1 < v2:
+                    less += p1 * p2
+                elif v1 == v2:
+                    equal += p1 * p2
+                else:
+                    greater += p1 * p2
+        return less, equal, greater
+
+    def testMatchesPairs(self):
+        rng = np.random.default_rng(17)
+        for values in [np.arange(40), np.arange(0, 20, 0.5)]:
+            for i in range(10):
+                pmf1 = RandomPmf(rng, values, 25)
+                pmf2 = RandomPmf(rng, values, 15)
+                expected = self.Loop(pmf1, pmf2)
+                actual = thinkbayes2.PmfCompare(pmf1, pmf2)
+                for x, y in zip(actual, expected):
+                    self.assertAlmostEqual(x, y, places=14)
+
+    def testStrings(self):
+        pmf1 = thinkbayes2.Pmf(['a', 'b', 'c'])
+        pmf2 = thinkbayes2.Pmf(['b', 'd'])
+        self.assertEqual(thinkbayes2.PmfCompare(pmf1, pmf2), self.Loop(pmf1, pmf2))
+
+if __name__ == '__main__':
+    unittest.main()
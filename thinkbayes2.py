@@ -28,9 +28,14 @@ import math
 import random
 import re
 
-from collections import Counter
+from collections import Counter, OrderedDict
 from operator import itemgetter
 
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
 import thinkplot
 
 import numpy as np
@@ -40,9 +45,16 @@ import scipy
 from scipy import stats
 from scipy import special
 from scipy import ndimage
+from scipy import signal
 
 ROOT2 = math.sqrt(2)
 
+# smallest support size for which Pmf addition tries the lattice fast path
+LATTICE_MIN_PAIRS = 64
+
+# use FFT instead of direct convolution when both supports are this long
+FFT_MIN_LENGTH = 500
+
 def RandomSeed(x):
     """Initialize the random and np.random generators.
 
@@ -50,6 +62,22 @@ def RandomSeed(x):
     """
     random.seed(x)
     np.random.seed(x)
+
+
+def RandomGenerators(x, n):
+    """Makes independent NumPy random Generators from one seed.
+
+    Like RandomSeed, this makes runs reproducible.  The generators
+    come from spawning a SeedSequence, so their streams don't overlap,
+    and they can be handed to separate processes.
+
+    x: int seed, or None for fresh entropy
+    n: number of generators
+
+    returns: list of np.random.Generator
+    """
+    children = np.random.SeedSequence(x).spawn(n)
+    return [np.random.default_rng(child) for child in children]
     
 
 def Odds(p):
@@ -124,17 +152,234 @@ class Interpolator(object):
         return y
 
 
+class _ArrayDict(MutableMapping):
+    """A map from numbers to freqs/probs stored in parallel NumPy arrays.
+
+    The values are kept sorted and unique, so whole-distribution
+    operations can work on the arrays directly instead of looping.
+
+    Attributes:
+        xs: sorted NumPy array of values
+        ps: NumPy array of freqs/probs, parallel to xs
+    """
+
+    def __init__(self, xs=(), ps=()):
+        """Initializes the map.
+
+        Values that appear more than once are merged by adding
+        their freqs/probs.
+
+        xs: sequence of values
+        ps: sequence of freqs/probs
+        """
+        xs = np.array(xs, dtype=None if len(xs) else float)
+        ps = np.array(ps, dtype=None if len(ps) else float)
+        if xs.ndim != 1 or xs.shape != ps.shape:
+            raise ValueError('_ArrayDict: xs and ps must be parallel '
+                             'one-dimensional sequences')
+
+        if len(xs) > 1 and np.any(xs[1:] <= xs[:-1]):
+            xs, index = np.unique(xs, return_inverse=True)
+            sums = np.bincount(index.ravel(), weights=ps, minlength=len(xs))
+            ps = sums.astype(ps.dtype)
+
+        self.xs = xs
+        self.ps = ps
+        self._index = None
+
+    def _Index(self):
+        """Returns a dictionary that maps from values to indices."""
+        if self._index is None:
+            self._index = dict((x, i) for i, x in enumerate(self.xs.tolist()))
+        return self._index
+
+    def ReadOnly(self):
+        """Returns read-only views of xs and ps."""
+        xs, ps = self.xs.view(), self.ps.view()
+        xs.flags.writeable = False
+        ps.flags.writeable = False
+        return xs, ps
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __iter__(self):
+        return iter(self.xs.tolist())
+
+    def __contains__(self, x):
+        return x in self._Index()
+
+    def __getitem__(self, x):
+        return self.ps[self._Index()[x]]
+
+    def get(self, x, default=None):
+        i = self._Index().get(x)
+        return default if i is None else self.ps[i]
+
+    def __setitem__(self, x, p):
+        if self.ps.dtype.kind != 'f':
+            dtype = np.result_type(self.ps, p)
+            if dtype != self.ps.dtype:
+                self.ps = self.ps.astype(dtype)
+
+        i = self._Index().get(x)
+        if i is not None:
+            self.ps[i] = p
+            return
+
+        #widen xs so the new value isn't truncated to fit
+        dtype = np.result_type(self.xs, np.asarray(x))
+        if dtype != self.xs.dtype:
+            self.xs = self.xs.astype(dtype)
+            self._index = None
+
+        i = np.searchsorted(self.xs, x)
+        self.xs = np.insert(self.xs, i, x)
+        self.ps = np.insert(self.ps, i, p)
+        self._index = None
+
+    def __delitem__(self, x):
+        i = self._Index()[x]
+        self.xs = np.delete(self.xs, i)
+        self.ps = np.delete(self.ps, i)
+        self._index = None
+
+    def __copy__(self):
+        new = object.__new__(type(self))
+        for name, value in self.__dict__.items():
+            if isinstance(value, np.ndarray):
+                value = value.copy()
+            new.__dict__[name] = value
+        return new
+
+    copy = __copy__
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def clear(self):
+        self.xs = self.xs[:0]
+        self.ps = self.ps[:0]
+        self._index = None
+
+    def keys(self):
+        return self.xs.tolist()
+
+    def values(self):
+        return self.ps.tolist()
+
+    def items(self):
+        return list(zip(self.xs.tolist(), self.ps.tolist()))
+
+    def IsLog(self):
+        """Checks whether the probabilities are currently held as logs."""
+        return False
+
+
+class _LogArrayDict(_ArrayDict):
+    """An _ArrayDict that can hold its probabilities as logs.
+
+    Reading ps gives linear probabilities and reading logps gives log
+    probabilities; either one converts the storage, so a run of log
+    space updates only pays for exponentiating when something reads
+    the probabilities.
+    """
+
+    def __init__(self, xs=(), ps=()):
+        self._ps = None
+        self._logps = None
+        _ArrayDict.__init__(self, xs, ps)
+
+    @property
+    def ps(self):
+        if self._ps is None:
+            self._ps = np.exp(self._logps)
+            self._logps = None
+        return self._ps
+
+    @ps.setter
+    def ps(self, ps):
+        self._ps = ps
+        self._logps = None
+
+    @property
+    def logps(self):
+        if self._logps is None:
+            with np.errstate(divide='ignore'):
+                self._logps = np.log(self._ps)
+            self._ps = None
+        return self._logps
+
+    @logps.setter
+    def logps(self, logps):
+        self._logps = logps
+        self._ps = None
+
+    def IsLog(self):
+        """Checks whether the probabilities are currently held as logs."""
+        return self._logps is not None
+
+
+def _MakeArrayDict(obj, cls=_ArrayDict):
+    """Makes an _ArrayDict from any of the objects _DictWrapper accepts.
+
+    obj: Hist, Pmf, Cdf, Pdf, dict, pandas Series, list or array
+    cls: _ArrayDict or a subclass
+
+    returns: _ArrayDict
+    """
+    if obj is None:
+        return cls()
+
+    if isinstance(obj, dict):
+        return cls(list(obj.keys()), list(obj.values()))
+
+    if isinstance(obj, _DictWrapper):
+        return cls(*obj.GetArrays())
+
+    if isinstance(obj, (Cdf, Pdf)):
+        items = list(obj.Items())
+        if not items:
+            return cls()
+        xs, ps = zip(*items)
+        return cls(xs, ps)
+
+    if isinstance(obj, pandas.Series):
+        counts = obj.value_counts()
+        return cls(counts.index.values, counts.values)
+
+    # finally, treat it like a list
+    xs = np.asarray(obj if isinstance(obj, np.ndarray) else list(obj))
+    return cls(xs, np.ones(len(xs), dtype=int))
+
+
+STORAGES = {'dict': dict, 'array': _ArrayDict, 'log': _LogArrayDict}
+
+
 class _DictWrapper(object):
     """An object that contains a dictionary."""
 
-    def __init__(self, obj=None, label=None):
+    # cached (Cdf, total) pair; methods that change the distribution
+    # reset it with _Modified
+    _cdf = None
+
+    def __init__(self, obj=None, label=None, storage=None):
         """Initializes the distribution.
 
         obj: Hist, Pmf, Cdf, Pdf, dict, pandas Series, list of pairs
         label: string label
+        storage: 'dict', 'array' or 'log'; if omitted, NumPy arrays get
+                 array storage and everything else gets a dict.  'log' is
+                 array storage that keeps Suite updates in log space.
         """
         self.label = label if label is not None else '_nolegend_'
-        self.d = {}
+
+        if storage is None:
+            storage = 'array' if isinstance(obj, np.ndarray) else 'dict'
+        if storage not in STORAGES:
+            raise ValueError('Unknown storage: %s' % storage)
+
+        self.d = STORAGES[storage]()
 
         # flag whether the distribution is under a log transform
         self.log = False
@@ -145,7 +390,9 @@ class _DictWrapper(object):
         if isinstance(obj, (_DictWrapper, Cdf, Pdf)):
             self.label = label if label is not None else obj.label
 
-        if isinstance(obj, dict):
+        if storage != 'dict':
+            self.d = _MakeArrayDict(obj, STORAGES[storage])
+        elif isinstance(obj, dict):
             self.d.update(obj.items())
         elif isinstance(obj, (_DictWrapper, Cdf, Pdf)):
             self.d.update(obj.Items())
@@ -187,11 +434,21 @@ class _DictWrapper(object):
         return self.d.get(value, 0)
 
     def __setitem__(self, value, prob):
+        self._Modified()
         self.d[value] = prob
 
     def __delitem__(self, value):
+        self._Modified()
         del self.d[value]
 
+    def _Modified(self):
+        """Drops cached values that depend on the distribution.
+
+        Code that changes self.d directly, rather than through the
+        methods of this class, should call it.
+        """
+        self._cdf = None
+
     def Copy(self, label=None):
         """Returns a copy.
 
@@ -215,6 +472,10 @@ class _DictWrapper(object):
         Returns: new object
         """
         new = self.Copy()
+        if self.IsArray():
+            new.SetArrays(self.d.xs * factor, self.d.ps)
+            return new
+
         new.d.clear()
 
         for val, prob in self.Items():
@@ -231,10 +492,16 @@ class _DictWrapper(object):
         if self.log:
             raise ValueError("Pmf/Hist already under a log transform")
         self.log = True
+        self._Modified()
 
         if m is None:
             m = self.MaxLike()
 
+        if self.IsArray():
+            keep = self.d.ps != 0
+            self.SetArrays(self.d.xs[keep], np.log(self.d.ps[keep] / m))
+            return
+
         for x, p in self.d.items():
             if p:
                 self.Set(x, math.log(p / m))
@@ -251,10 +518,15 @@ class _DictWrapper(object):
         if not self.log:
             raise ValueError("Pmf/Hist not under a log transform")
         self.log = False
+        self._Modified()
 
         if m is None:
             m = self.MaxLike()
 
+        if self.IsArray():
+            self.d.ps = np.exp(self.d.ps - m)
+            return
+
         for x, p in self.d.items():
             self.Set(x, math.exp(p - m))
 
@@ -264,8 +536,47 @@ class _DictWrapper(object):
 
     def SetDict(self, d):
         """Sets the dictionary."""
+        self._Modified()
         self.d = d
 
+    def IsArray(self):
+        """Checks whether the distribution uses array storage."""
+        return isinstance(self.d, _ArrayDict)
+
+    def IsLogStorage(self):
+        """Checks whether the distribution uses log storage."""
+        return isinstance(self.d, _LogArrayDict)
+
+    def GetArrays(self):
+        """Gets the values and freqs/probs as parallel NumPy arrays.
+
+        The values are sorted.  With array storage, the arrays are
+        read-only views of the storage, so no copy is made.
+
+        Returns:
+            tuple of (values, freqs/probs)
+        """
+        if self.IsArray():
+            return self.d.ReadOnly()
+
+        if len(self.d) == 0:
+            return np.asarray([]), np.asarray([])
+
+        xs, ps = zip(*sorted(self.d.items()))
+        return np.asarray(xs), np.asarray(ps)
+
+    def SetArrays(self, xs, ps):
+        """Switches to array storage with the given values and freqs/probs.
+
+        Repeated values are merged by adding their freqs/probs.
+
+        xs: sequence of values
+        ps: sequence of freqs/probs
+        """
+        self._Modified()
+        cls = type(self.d) if self.IsArray() else _ArrayDict
+        self.d = cls(xs, ps)
+
     def Values(self):
         """Gets an unsorted sequence of values.
 
@@ -290,12 +601,36 @@ class _DictWrapper(object):
         if min(self.d.keys()) is np.nan:
             logging.warning('Hist: contains NaN, may not render correctly.')
 
+        if self.IsArray():
+            return self.d.xs.copy(), self.d.ps.copy()
+
         return zip(*sorted(self.Items()))
 
     def MakeCdf(self, label=None):
         """Makes a Cdf."""
         label = label if label is not None else self.label
-        return Cdf(self, label=label)
+        cdf, _ = self._CachedCdf()
+        return Cdf(cdf.xs.copy(), cdf.ps.copy(), label=label)
+
+    def _CachedCdf(self):
+        """Gets the Cdf of this distribution.
+
+        The Cdf is computed once and kept until the distribution changes,
+        so repeated percentile queries only cost a binary search.
+
+        Returns:
+            tuple of (Cdf, total of the freqs/probs)
+        """
+        if self._cdf is None:
+            xs, ps = self.GetArrays()
+            if len(xs) == 0:
+                self._cdf = Cdf(label=self.label), 0
+            else:
+                cumulative = np.cumsum(ps, dtype=float)
+                total = cumulative[-1]
+                cdf = Cdf(xs, cumulative / total, label=self.label)
+                self._cdf = cdf, total
+        return self._cdf
 
     def Print(self):
         """Prints the values and freqs/probs in ascending order."""
@@ -309,6 +644,7 @@ class _DictWrapper(object):
             x: number value
             y: number freq or prob
         """
+        self._Modified()
         self.d[x] = y
 
     def Incr(self, x, term=1):
@@ -318,6 +654,7 @@ class _DictWrapper(object):
             x: number value
             term: how much to increment by
         """
+        self._Modified()
         self.d[x] = self.d.get(x, 0) + term
 
     def Mult(self, x, factor):
@@ -327,6 +664,7 @@ class _DictWrapper(object):
             x: number value
             factor: how much to multiply by
         """
+        self._Modified()
         self.d[x] = self.d.get(x, 0) * factor
 
     def Remove(self, x):
@@ -337,15 +675,22 @@ class _DictWrapper(object):
         Args:
             x: value to remove
         """
+        self._Modified()
         del self.d[x]
 
     def Total(self):
         """Returns the total of the frequencies/probabilities in the map."""
+        if self.IsArray():
+            return self.d.ps.sum()
+
         total = sum(self.d.values())
         return total
 
     def MaxLike(self):
         """Returns the largest frequency/probability in the map."""
+        if self.IsArray():
+            return self.d.ps.max()
+
         return max(self.d.values())
 
     def Largest(self, n=10):
@@ -423,19 +768,18 @@ class Pmf(_DictWrapper):
     def Percentile(self, percentage):
         """Computes a percentile of a given Pmf.
 
-        Note: this is not super efficient.  If you are planning
-        to compute more than a few percentiles, compute the Cdf.
+        Uses the cached Cdf, so after the first call it only costs
+        a binary search until the Pmf changes.
 
         percentage: float 0-100
 
         returns: value from the Pmf
         """
         p = percentage / 100.0
-        total = 0
-        for val, prob in sorted(self.Items()):
-            total += prob
-            if total >= p:
-                return val
+        cdf, total = self._CachedCdf()
+        if p > total:
+            return None
+        return cdf.Value(min(p / total, 1.0))
 
     def ProbGreater(self, x):
         """Probability that a sample from this Pmf exceeds x.
@@ -446,6 +790,8 @@ class Pmf(_DictWrapper):
         """
         if isinstance(x, _DictWrapper):
             return PmfProbGreater(self, x)
+        elif self.IsArray():
+            return self.d.ps[self.d.xs > x].sum()
         else:
             t = [prob for (val, prob) in self.d.items() if val > x]
             return sum(t)
@@ -459,6 +805,8 @@ class Pmf(_DictWrapper):
         """
         if isinstance(x, _DictWrapper):
             return PmfProbLess(self, x)
+        elif self.IsArray():
+            return self.d.ps[self.d.xs < x].sum()
         else:
             t = [prob for (val, prob) in self.d.items() if val < x]
             return sum(t)
@@ -510,6 +858,10 @@ class Pmf(_DictWrapper):
         if self.log:
             raise ValueError("Normalize: Pmf is under a log transform")
 
+        self._Modified()
+        if self.IsArray() and self.d.IsLog():
+            return np.exp(self.LogNormalize(fraction))
+
         total = self.Total()
         if total == 0.0:
             raise ValueError('Normalize: total probability is zero.')
@@ -517,11 +869,40 @@ class Pmf(_DictWrapper):
             #return total
 
         factor = fraction / total
+        if self.IsArray():
+            self.d.ps = self.d.ps * factor
+            return total
+
         for x in self.d:
             self.d[x] *= factor
 
         return total
 
+    def LogNormalize(self, fraction=1.0):
+        """Normalizes this PMF so the sum of all probs is fraction.
+
+        With log storage, the total comes from logsumexp of the log
+        probabilities, so this works even when the probabilities are
+        too small to represent.
+
+        Args:
+            fraction: what the total should be after normalizing
+
+        Returns: the log of the total probability before normalizing
+        """
+        if not self.IsLogStorage():
+            return math.log(self.Normalize(fraction))
+        if self.log:
+            raise ValueError("LogNormalize: Pmf is under a log transform")
+
+        log_total = special.logsumexp(self.d.logps)
+        if log_total == -np.inf:
+            raise ValueError('Normalize: total probability is zero.')
+
+        self._Modified()
+        self.d.logps = self.d.logps - log_total + math.log(fraction)
+        return log_total
+
     def Random(self):
         """Chooses a random element from this PMF.
 
@@ -532,6 +913,12 @@ class Pmf(_DictWrapper):
             float value from the Pmf
         """
         target = random.random()
+        if self.IsArray():
+            index = np.searchsorted(np.cumsum(self.d.ps), target)
+            if index < len(self.d.xs):
+                return self.d.xs[index]
+            raise ValueError('Random: Pmf might not be normalized.')
+
         total = 0.0
         for x, p in self.d.items():
             total += p
@@ -547,6 +934,9 @@ class Pmf(_DictWrapper):
         Returns:
             float mean
         """
+        if self.IsArray():
+            return np.dot(self.d.xs, self.d.ps)
+
         mean = 0.0
         for x, p in self.d.items():
             mean += p * x
@@ -563,6 +953,9 @@ class Pmf(_DictWrapper):
         if mu is None:
             mu = self.Mean()
 
+        if self.IsArray():
+            return np.dot(self.d.ps, (self.d.xs - mu) ** 2)
+
         var = 0.0
         for x, p in self.d.items():
             var += p * (x - mu) ** 2
@@ -584,6 +977,11 @@ class Pmf(_DictWrapper):
 
         Returns: float probability
         """
+        if self.IsArray():
+            # like max over (prob, val), prefer the largest value on ties
+            index = len(self.d.ps) - 1 - np.argmax(self.d.ps[::-1])
+            return self.d.xs[index]
+
         _, val = max((prob, val) for val, prob in self.Items())
         return val
 
@@ -598,7 +996,7 @@ class Pmf(_DictWrapper):
         Returns:
             sequence of two floats, low and high
         """
-        cdf = self.MakeCdf()
+        cdf, _ = self._CachedCdf()
         return cdf.CredibleInterval(percentage)
 
     def __add__(self, other):
@@ -620,6 +1018,10 @@ class Pmf(_DictWrapper):
 
         returns: new Pmf
         """
+        pmf = LatticeConvolve(self, other)
+        if pmf is not None:
+            return pmf
+
         pmf = Pmf()
         for v1, p1 in self.Items():
             for v2, p2 in other.Items():
@@ -634,6 +1036,10 @@ class Pmf(_DictWrapper):
         returns: new Pmf
         """
         pmf = Pmf()
+        if self.IsArray():
+            pmf.SetArrays(self.d.xs + other, self.d.ps)
+            return pmf
+
         for v1, p1 in self.Items():
             pmf.Set(v1 + other, p1)
         return pmf
@@ -657,6 +1063,10 @@ class Pmf(_DictWrapper):
 
         returns: new Pmf
         """
+        pmf = LatticeConvolve(self, other, subtract=True)
+        if pmf is not None:
+            return pmf
+
         pmf = Pmf()
         for v1, p1 in self.Items():
             for v2, p2 in other.Items():
@@ -696,6 +1106,10 @@ class Pmf(_DictWrapper):
         returns: new Pmf
         """
         pmf = Pmf()
+        if self.IsArray():
+            pmf.SetArrays(self.d.xs * other, self.d.ps)
+            return pmf
+
         for v1, p1 in self.Items():
             pmf.Set(v1 * other, p1)
         return pmf
@@ -734,7 +1148,7 @@ class Pmf(_DictWrapper):
 
         returns: new Cdf
         """
-        cdf = self.MakeCdf()
+        cdf, _ = self._CachedCdf()
         return cdf.Max(k)
 
 
@@ -910,13 +1324,71 @@ def MakeMixture(metapmf, label='mix'):
 
     Returns: Pmf object.
     """
+    items = list(metapmf.Items())
+    pmfs = [pmf for pmf, _ in items]
+    if items and all(isinstance(pmf, _DictWrapper) for pmf in pmfs):
+        weights = [p1 for _, p1 in items]
+        arrays = [pmf.GetArrays() for pmf in pmfs]
+        if all(xs.dtype.kind in 'iuf' for xs, _ in arrays):
+            support, matrix = _StackOnSupport(arrays)
+            return MakeMixtureMatrix(weights, matrix, support, label=label)
+
     mix = Pmf(label=label)
-    for pmf, p1 in metapmf.Items():
+    for pmf, p1 in items:
         for x, p2 in pmf.Items():
             mix.Incr(x, p1 * p2)
     return mix
 
 
+def _StackOnSupport(arrays):
+    """Lines up the probabilities of several distributions.
+
+    arrays: sequence of (xs, ps) pairs from GetArrays
+
+    Returns: tuple of (support, matrix), where support is the sorted
+             union of the xs and the matrix has one row per distribution
+    """
+    first = arrays[0][0]
+    if all(np.array_equal(xs, first) for xs, _ in arrays):
+        return first, np.vstack([ps for _, ps in arrays])
+
+    support = np.unique(np.concatenate([xs for xs, _ in arrays]))
+    matrix = np.zeros((len(arrays), len(support)))
+    for row, (xs, ps) in zip(matrix, arrays):
+        row[np.searchsorted(support, xs)] = ps
+    return support, matrix
+
+
+def MakeMixtureMatrix(weights, component_matrix, support, label='mix',
+                      tol=None):
+    """Make a mixture of distributions that share a support.
+
+    Args:
+      weights: sequence of probs, one for each component
+      component_matrix: array with one row of probs for each component
+                        and one column for each value in the support
+      support: sequence of values
+      label: string label for the new Pmf.
+      tol: if given, drop values from the end of the support as long
+           as their total probability is at most tol, and renormalize
+
+    Returns: Pmf object with array storage; its discarded attribute is
+             the probability that was dropped.
+    """
+    ps = np.dot(np.asarray(weights), component_matrix)
+    discarded = 0.0
+    if tol is not None:
+        tails = np.cumsum(ps[::-1])[::-1]
+        n = max(np.count_nonzero(tails > tol), 1)
+        total = tails[0]
+        discarded = float(tails[n]) / total if n < len(ps) else 0.0
+        support, ps = support[:n], ps[:n] / (total - total * discarded)
+    mix = Pmf(label=label)
+    mix.SetArrays(support, ps)
+    mix.discarded = discarded
+    return mix
+
+
 def MakeUniformPmf(low, high, n):
     """Make a uniform Pmf.
 
@@ -987,9 +1459,9 @@ class Cdf(object):
             self.ps = np.asarray([])
             return
 
-        xs, freqs = zip(*sorted(dw.Items()))
-        self.xs = np.asarray(xs)
-        self.ps = np.cumsum(freqs, dtype=np.float)
+        xs, freqs = dw.GetArrays()
+        self.xs = np.array(xs)
+        self.ps = np.cumsum(freqs, dtype=float)
         self.ps /= self.ps[-1]
 
     def __str__(self):
@@ -1160,13 +1632,24 @@ class Cdf(object):
         Returns:
             float mean
         """
-        old_p = 0
-        total = 0.0
-        for x, new_p in zip(self.xs, self.ps):
-            p = new_p - old_p
-            total += p * x
-            old_p = new_p
-        return total
+        return np.dot(np.asarray(self.xs), self._Probs())
+
+    def Var(self, mu=None):
+        """Computes the variance of a CDF.
+
+        mu: the point around which the variance is computed;
+                if omitted, computes the mean
+
+        returns: float variance
+        """
+        if mu is None:
+            mu = self.Mean()
+
+        return np.dot(self._Probs(), (np.asarray(self.xs) - mu) ** 2)
+
+    def _Probs(self):
+        """Returns a NumPy array of the probabilities of the xs."""
+        return np.diff(np.concatenate([[0.0], self.ps]))
 
     def CredibleInterval(self, percentage=90):
         """Computes the central credible interval.
@@ -1307,7 +1790,13 @@ class UnimplementedMethodException(Exception):
 
 
 class Suite(Pmf):
-    """Represents a suite of hypotheses and their probabilities."""
+    """Represents a suite of hypotheses and their probabilities.
+
+    With storage='log', the updates accumulate log likelihoods and
+    Normalize uses logsumexp, so long datasets do not underflow.  The
+    normalizing constants the updates return can still underflow;
+    LogNormalize returns the log of the constant instead.
+    """
 
     def Update(self, data):
         """Updates each hypothesis based on the data.
@@ -1316,9 +1805,8 @@ class Suite(Pmf):
 
         returns: the normalizing constant
         """
-        for hypo in self.Values():
-            like = self.Likelihood(data, hypo)
-            self.Mult(hypo, like)
+        hypos = self._Hypos()
+        self._MultAll(hypos, self._Likelihoods(data, hypos))
         return self.Normalize()
 
     def LogUpdate(self, data):
@@ -1329,12 +1817,21 @@ class Suite(Pmf):
 
         Note: unlike Update, LogUpdate does not normalize.
 
+        With log storage, the log likelihoods go straight into the log
+        probabilities, so there is no need for Log and Exp.  After Log,
+        the probs are already logs, so they are incremented as usual.
+
         Args:
             data: any representation of the data
         """
-        for hypo in self.Values():
-            like = self.LogLikelihood(data, hypo)
-            self.Incr(hypo, like)
+        hypos = self._Hypos()
+        loglikes = self._LogLikelihoods(data, hypos)
+        if self.IsLogStorage() and not self.log:
+            self._Modified()
+            self.d.logps = self.d.logps + loglikes
+            return
+
+        self._IncrAll(hypos, loglikes)
 
     def UpdateSet(self, dataset):
         """Updates each hypothesis based on the dataset.
@@ -1349,10 +1846,9 @@ class Suite(Pmf):
 
         returns: the normalizing constant
         """
+        hypos = self._Hypos()
         for data in dataset:
-            for hypo in self.Values():
-                like = self.Likelihood(data, hypo)
-                self.Mult(hypo, like)
+            self._MultAll(hypos, self._Likelihoods(data, hypos))
         return self.Normalize()
 
     def LogUpdateSet(self, dataset):
@@ -1368,6 +1864,33 @@ class Suite(Pmf):
         for data in dataset:
             self.LogUpdate(data)
 
+    def UpdateSufficient(self, stats):
+        """Updates each hypothesis based on summary statistics of a dataset.
+
+        Gives the same result as UpdateSet on the whole dataset, in one
+        step, for subclasses that provide SufficientLogLikelihood.
+
+        Modifies the suite directly; if you want to keep the original, make
+        a copy.
+
+        stats: sufficient statistics of the dataset
+
+        returns: the normalizing constant
+        """
+        hypos = self._Hypos()
+        loglikes = np.asarray(self.SufficientLogLikelihood(stats,
+                                                           np.asarray(hypos)))
+        if self.IsLogStorage() and not self.log:
+            self._Modified()
+            self.d.logps = self.d.logps + loglikes
+            return self.Normalize()
+
+        # shift the log likelihoods so the largest is 0, to avoid underflow
+        finite = np.isfinite(loglikes)
+        shift = loglikes[finite].max() if finite.any() else 0.0
+        self._MultAll(hypos, np.exp(loglikes - shift))
+        return self.Normalize() * np.exp(shift)
+
     def Likelihood(self, data, hypo):
         """Computes the likelihood of the data under the hypothesis.
 
@@ -1384,6 +1907,96 @@ class Suite(Pmf):
         """
         raise UnimplementedMethodException()
 
+    def SufficientLogLikelihood(self, stats, hypos):
+        """Computes the log likelihood of a dataset under all hypotheses.
+
+        Optional: subclasses provide it to support UpdateSufficient.
+
+        hypos: NumPy array of hypotheses
+        stats: sufficient statistics of the dataset
+
+        returns: NumPy array of log likelihoods
+        """
+        raise UnimplementedMethodException()
+
+    def VectorLikelihood(self, data, hypos):
+        """Computes the likelihood of the data under all hypotheses at once.
+
+        Optional: if a subclass provides it, the update methods use it
+        instead of calling Likelihood once per hypothesis.
+
+        hypos: NumPy array of hypotheses
+        data: some representation of the data
+
+        returns: NumPy array of likelihoods
+        """
+        raise UnimplementedMethodException()
+
+    def HasVectorLikelihood(self):
+        """Checks whether this suite provides VectorLikelihood."""
+        return type(self).VectorLikelihood != Suite.VectorLikelihood
+
+    def _Hypos(self):
+        """Gets the hypotheses, as an array if the storage is arrays."""
+        if self.IsArray():
+            return self.d.xs
+        return list(self.d)
+
+    def _Likelihoods(self, data, hypos):
+        """Computes the likelihood of the data under each hypothesis.
+
+        hypos: sequence of hypotheses from _Hypos
+
+        returns: NumPy array of likelihoods
+        """
+        if self.HasVectorLikelihood():
+            return np.asarray(self.VectorLikelihood(data, np.asarray(hypos)))
+
+        if isinstance(hypos, np.ndarray):
+            hypos = hypos.tolist()
+        return np.asarray([self.Likelihood(data, hypo) for hypo in hypos])
+
+    def _LogLikelihoods(self, data, hypos):
+        """Computes the log likelihood of the data under each hypothesis.
+
+        hypos: sequence of hypotheses from _Hypos
+
+        returns: NumPy array of log likelihoods
+        """
+        if self.HasVectorLikelihood():
+            likes = self.VectorLikelihood(data, np.asarray(hypos))
+            with np.errstate(divide='ignore'):
+                return np.log(likes)
+
+        if isinstance(hypos, np.ndarray):
+            hypos = hypos.tolist()
+        return np.asarray([self.LogLikelihood(data, hypo) for hypo in hypos])
+
+    def _MultAll(self, hypos, factors):
+        """Scales the prob of each hypothesis by the corresponding factor."""
+        self._Modified()
+        if self.IsLogStorage() and not self.log:
+            with np.errstate(divide='ignore'):
+                self.d.logps = self.d.logps + np.log(factors)
+            return
+
+        if self.IsArray():
+            self.d.ps = self.d.ps * factors
+            return
+
+        for hypo, factor in zip(hypos, factors):
+            self.Mult(hypo, factor)
+
+    def _IncrAll(self, hypos, terms):
+        """Increments the prob of each hypothesis by the corresponding term."""
+        self._Modified()
+        if self.IsArray():
+            self.d.ps = self.d.ps + terms
+            return
+
+        for hypo, term in zip(hypos, terms):
+            self.Incr(hypo, term)
+
     def Print(self):
         """Prints the hypotheses and their probabilities."""
         for hypo, prob in sorted(self.Items()):
@@ -1626,31 +2239,193 @@ def CredibleInterval(pmf, percentage=90):
     Returns:
         sequence of two floats, low and high
     """
-    cdf = pmf.MakeCdf()
+    cdf, _ = pmf._CachedCdf()
     prob = (1 - percentage / 100.0) / 2
     interval = cdf.Value(prob), cdf.Value(1 - prob)
     return interval
 
 
-def PmfProbLess(pmf1, pmf2):
-    """Probability that a value from pmf1 is less than a value from pmf2.
+def _LatticeStep(xs):
+    """Finds the spacing of the lattice that contains a sorted array.
+
+    xs: sorted NumPy array of unique values
+
+    Returns:
+        (step, is_integer), where step is 0 for a single value,
+        or None if the values are not numbers on a lattice
+    """
+    if xs.dtype.kind not in 'iuf' or len(xs) == 0:
+        return None
+    if len(xs) == 1:
+        return 0, bool(xs[0] == np.floor(xs[0]))
+
+    diffs = np.diff(xs)
+    if np.all(xs == np.floor(xs)):
+        return int(np.gcd.reduce(diffs.astype(np.int64))), True
+
+    step = diffs.min()
+    ks = (xs - xs[0]) / step
+    if not np.allclose(ks, np.rint(ks), rtol=0, atol=1e-6):
+        return None
+    return step, False
+
+
+def _CommonStep(lattice1, lattice2):
+    """Finds a lattice spacing that both lattices fit on.
+
+    lattice1, lattice2: (step, is_integer) pairs from _LatticeStep
+
+    Returns: number step, or None if there is none
+    """
+    (step1, int1), (step2, int2) = lattice1, lattice2
+    if int1 and int2:
+        return int(np.gcd(int(step1), int(step2))) or 1
+
+    small, large = sorted([step1, step2])
+    if small == 0:
+        return large or None
+
+    ratio = large / small
+    if abs(ratio - round(ratio)) > 1e-6:
+        return None
+    return small
+
+
+def _DenseOnLattice(xs, ps, step):
+    """Spreads probabilities onto a dense lattice.
+
+    xs: sorted NumPy array of values
+    ps: NumPy array of probs
+    step: lattice spacing
+
+    Returns: NumPy array of probs at xs[0], xs[0] + step, ...
+    """
+    ks = np.rint((xs - xs[0]) / step).astype(np.int64)
+    dense = np.zeros(ks[-1] + 1)
+    dense[ks] = ps
+    return dense
+
+
+def _Convolve(a, b):
+    """Convolves two arrays, using FFT if they are both long."""
+    if min(len(a), len(b)) >= FFT_MIN_LENGTH:
+        return signal.fftconvolve(a, b)
+    return np.convolve(a, b)
+
+
+def LatticeConvolve(pmf1, pmf2, subtract=False):
+    """Distribution of the sum or difference of values on a lattice.
+
+    If both supports are numbers on a common, reasonably dense lattice,
+    such as integers or multiples of a step, computes the distribution
+    with a single convolution.
 
     Args:
         pmf1: Pmf object
         pmf2: Pmf object
+        subtract: whether to compute pmf1 - pmf2 instead of pmf1 + pmf2
 
     Returns:
-        float probability
+        new Pmf with array storage, or None if the fast path does not apply
+    """
+    if not isinstance(pmf1, _DictWrapper) or not isinstance(pmf2, _DictWrapper):
+        return None
+    if len(pmf1) * len(pmf2) < LATTICE_MIN_PAIRS:
+        return None
+
+    xs1, ps1 = pmf1.GetArrays()
+    xs2, ps2 = pmf2.GetArrays()
+
+    lattice1, lattice2 = _LatticeStep(xs1), _LatticeStep(xs2)
+    if lattice1 is None or lattice2 is None:
+        return None
+
+    step = _CommonStep(lattice1, lattice2)
+    if step is None:
+        return None
+
+    # give up if the dense lattice is much bigger than the support
+    for xs in [xs1, xs2]:
+        if (xs[-1] - xs[0]) / step > 8 * len(xs) + 64:
+            return None
+
+    dense1 = _DenseOnLattice(xs1, ps1, step)
+    dense2 = _DenseOnLattice(xs2, ps2, step)
+    if subtract:
+        dense2 = dense2[::-1]
+        low = xs1[0] - xs2[-1]
+    else:
+        low = xs1[0] + xs2[0]
+
+    ps = _Convolve(dense1, dense2)
+
+    # keep only the values that can actually happen
+    support1 = _DenseOnLattice(xs1, np.ones(len(xs1)), step)
+    support2 = _DenseOnLattice(xs2, np.ones(len(xs2)), step)
+    if subtract:
+        support2 = support2[::-1]
+    reachable = _Convolve(support1, support2) > 0.5
+    if xs1.dtype.kind in 'iu' and xs2.dtype.kind in 'iu':
+        xs = low + step * np.arange(len(ps))
+    else:
+        xs = low + step * np.arange(len(ps), dtype=float)
+
+    pmf = Pmf()
+    pmf.SetArrays(xs[reachable], np.maximum(ps[reachable], 0))
+    return pmf
+
+
+def PmfCompare(pmf1, pmf2):
+    """Compares a value from pmf1 with a value from pmf2.
+
+    Sorts both supports and uses the cumulative probabilities of pmf2,
+    so it takes O((n+m) log(n+m)) time instead of comparing every pair.
+
+    Args:
+        pmf1: Pmf object
+        pmf2: Pmf object
+
+    Returns:
+        tuple of float probabilities (less, equal, greater)
     """
-    total = 0.0
+    xs1, ps1 = pmf1.GetArrays()
+    xs2, ps2 = pmf2.GetArrays()
+    if xs1.dtype.kind not in 'iuf' or xs2.dtype.kind not in 'iuf':
+        return _PmfCompareLoops(pmf1, pmf2)
+
+    cumulative = np.concatenate([[0.0], np.cumsum(ps2)])
+    below = cumulative[np.searchsorted(xs2, xs1, side='left')]
+    upto = cumulative[np.searchsorted(xs2, xs1, side='right')]
+
+    less = np.dot(ps1, cumulative[-1] - upto)
+    equal = np.dot(ps1, upto - below)
+    greater = np.dot(ps1, below)
+    return less, equal, greater
+
+
+def _PmfCompareLoops(pmf1, pmf2):
+    """Compares every pair of values, for Pmfs whose values are not numbers.
+
+    Args:
+        pmf1: Pmf object
+        pmf2: Pmf object
+
+    Returns:
+        tuple of float probabilities (less, equal, greater)
+    """
+    less, equal, greater = 0.0, 0.0, 0.0
     for v1, p1 in pmf1.Items():
         for v2, p2 in pmf2.Items():
             if v1 < v2:
-                total += p1 * p2
-    return total
+                less += p1 * p2
+            elif v1 == v2:
+                equal += p1 * p2
+            elif v1 > v2:
+                greater += p1 * p2
+    return less, equal, greater
 
 
-def PmfProbGreater(pmf1, pmf2):
+def PmfProbLess(pmf1, pmf2):
     """Probability that a value from pmf1 is less than a value from pmf2.
 
     Args:
@@ -1660,12 +2435,22 @@ def PmfProbGreater(pmf1, pmf2):
     Returns:
         float probability
     """
-    total = 0.0
-    for v1, p1 in pmf1.Items():
-        for v2, p2 in pmf2.Items():
-            if v1 > v2:
-                total += p1 * p2
-    return total
+    less, _, _ = PmfCompare(pmf1, pmf2)
+    return less
+
+
+def PmfProbGreater(pmf1, pmf2):
+    """Probability that a value from pmf1 is greater than a value from pmf2.
+
+    Args:
+        pmf1: Pmf object
+        pmf2: Pmf object
+
+    Returns:
+        float probability
+    """
+    _, _, greater = PmfCompare(pmf1, pmf2)
+    return greater
 
 
 def PmfProbEqual(pmf1, pmf2):
@@ -1678,12 +2463,8 @@ def PmfProbEqual(pmf1, pmf2):
     Returns:
         float probability
     """
-    total = 0.0
-    for v1, p1 in pmf1.Items():
-        for v2, p2 in pmf2.Items():
-            if v1 == v2:
-                total += p1 * p2
-    return total
+    _, equal, _ = PmfCompare(pmf1, pmf2)
+    return equal
 
 
 def RandomSum(dists):
@@ -1750,6 +2531,23 @@ def EvalBinomialPmf(k, n, p):
     return stats.binom.pmf(k, n, p)
     
 
+def EvalBetaBinomialPmf(k, n, alpha, beta):
+    """Evaluates the beta-binomial PMF.
+
+    Returns the probability of k successes in n trials, where the
+    probability of success has a Beta(alpha, beta) distribution.
+    k and n can be NumPy arrays; the result is 0 where k > n.
+    """
+    k, n = np.broadcast_arrays(np.asarray(k), np.asarray(n))
+    valid = (0 <= k) & (k <= n)
+    k, n = np.where(valid, k, 0), np.where(valid, n, 0)
+    log_pmf = (special.gammaln(n + 1) - special.gammaln(k + 1) -
+               special.gammaln(n - k + 1) +
+               special.betaln(k + alpha, n - k + beta) -
+               special.betaln(alpha, beta))
+    return np.where(valid, np.exp(log_pmf), 0.0)
+
+
 def EvalHypergeomPmf(k, N, K, n):
     """Evaluates the hypergeometric PMF.
 
@@ -1770,34 +2568,264 @@ def EvalPoissonPmf(k, lam):
     # don't use the scipy function (yet).  for lam=0 it returns NaN;
     # should be 0.0
     # return stats.poisson.pmf(k, lam)
-    return lam ** k * math.exp(-lam) / special.gamma(k+1)
+    return np.exp(EvalPoissonLogPmf(k, lam))
+
+
+def EvalPoissonLogPmf(k, lam):
+    """Computes the log of the Poisson PMF.
+
+    Unlike lam ** k, this doesn't overflow for large k.
+
+    k: number of events
+    lam: parameter lambda in events per unit time
+
+    Either argument can be a NumPy array.
+
+    returns: float log probability
+    """
+    return special.xlogy(k, lam) - lam - special.gammaln(np.add(k, 1))
+
+
+def PoissonTailMass(lam, high):
+    """Computes the probability that a Poisson value exceeds high.
+
+    lam: parameter lambda; can be a NumPy array
+    high: upper bound
+
+    returns: float probability
+    """
+    return special.gammainc(high + 1, lam)
+
+
+def TruncatePoisson(lam, tol=1e-12):
+    """Finds where to cut off a Poisson distribution.
+
+    lam: parameter lambda; can be a NumPy array
+    tol: largest probability to leave in the tail
+
+    returns: tuple of (high, discarded), the smallest upper bound
+             that leaves at most tol above it, and the probability
+             it leaves
+    """
+    lam = np.asarray(lam, dtype=float)
+
+    # the tail beyond bound is far smaller than any useful tol
+    bound = int(np.ceil(np.max(lam) + 12 * np.sqrt(np.max(lam)) + 40))
+    ks = np.arange(bound + 1)
+    ps = np.exp(EvalPoissonLogPmf(ks, lam[..., np.newaxis]))
+
+    # tails[..., k] is the probability of values greater than k,
+    # summed from the small end so it stays accurate
+    tails = np.cumsum(ps[..., ::-1], axis=-1)[..., ::-1]
+    tails = np.concatenate([tails[..., 1:], np.zeros_like(tails[..., :1])],
+                           axis=-1)
+    high = np.argmax(tails <= tol, axis=-1)
+    return high, PoissonTailMass(lam, high)
 
 
-def MakePoissonPmf(lam, high, step=1):
+def _PoissonHigh(lam, high, tol):
+    """Chooses the upper bound for Poisson Pmfs.
+
+    lam: parameter lambda, or array of lambdas
+    high: upper bound, or None to choose it from tol
+    tol: tail probability, or None to use high
+
+    returns: int upper bound
+    """
+    if tol is not None:
+        # the tail mass increases with lambda, so the largest one decides
+        high, _ = TruncatePoisson(np.max(lam), tol)
+        return int(high)
+    if high is None:
+        raise ValueError('MakePoissonPmf needs high or tol.')
+    return high
+
+
+def MakePoissonPmf(lam, high=None, step=1, tol=None):
     """Makes a PMF discrete approx to a Poisson distribution.
 
     lam: parameter lambda in events per unit time
     high: upper bound of the Pmf
+    tol: if given, high is the smallest upper bound that leaves
+         at most tol in the tail; see TruncatePoisson
 
-    returns: normalized Pmf
+    returns: normalized Pmf; its discarded attribute is the probability
+             of the tail above high, which normalizing spreads over the
+             rest of the values
     """
+    high = _PoissonHigh(lam, high, tol)
+    ks = np.arange(0, high + 1, step)
     pmf = Pmf()
-    for k in range(0, high + 1, step):
-        p = EvalPoissonPmf(k, lam)
-        pmf.Set(k, p)
+    pmf.SetArrays(ks, EvalPoissonPmf(ks, lam))
     pmf.Normalize()
+    pmf.discarded = float(PoissonTailMass(lam, ks[-1]))
     return pmf
 
 
+def MakePoissonMatrix(lams, high=None, step=1, tol=None):
+    """Makes PMF discrete approxes to several Poisson distributions.
+
+    Each row is the same as the Pmf MakePoissonPmf(lam, high, step) makes.
+
+    lams: sequence of parameters lambda
+    high: upper bound of the Pmfs
+    tol: if given, high is the smallest upper bound that leaves
+         at most tol in the tail of every row
+
+    returns: tuple of (ks, matrix), with one row for each lambda
+             and one column for each k; the rows are normalized, and
+             the probability each one leaves out of the tail is
+             PoissonTailMass(lams, ks[-1])
+    """
+    lams = np.asarray(lams, dtype=float)
+    high = _PoissonHigh(lams, high, tol)
+    ks = np.arange(0, high + 1, step)
+    lams = lams[:, np.newaxis]
+    matrix = EvalPoissonPmf(ks, lams)
+    matrix /= matrix.sum(axis=1, keepdims=True)
+    return ks, matrix
+
+
+class PoissonTable(object):
+    """Memoizes the matrices MakePoissonMatrix makes.
+
+    A table is keyed on a grid of rates, the time they are multiplied
+    by, and the upper bound of the Pmfs.  When it gets too big, the
+    least recently used matrices are evicted.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=64 * 2**20):
+        """Initializes an empty table.
+
+        max_entries: maximum number of matrices to keep, or None
+        max_bytes: maximum total size of the matrices, or None
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.Clear()
+
+    def Clear(self):
+        """Removes all matrices and resets the stats."""
+        self.table = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.table)
+
+    def Lookup(self, lams, t=1, high=20, tol=None):
+        """Looks up the Poisson distributions with parameters lams * t.
+
+        The matrix is computed the first time it is looked up.  The
+        arrays are shared between callers, so they are read-only.
+
+        lams: sequence of rates lambda
+        t: time the rates are multiplied by
+        high: upper bound of the Pmfs
+        tol: if given, choose the upper bound from the tail probability
+
+        returns: tuple of (ks, matrix), as MakePoissonMatrix
+        """
+        lams = np.ascontiguousarray(lams, dtype=float)
+        if tol is not None:
+            high = None
+        key = (lams.tobytes(), float(t), high, tol)
+
+        entry = self.table.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            entry = MakePoissonMatrix(lams * t, high, tol=tol)
+            for array in entry:
+                array.flags.writeable = False
+            self.nbytes += sum(array.nbytes for array in entry)
+        else:
+            self.hits += 1
+
+        # reinserting the entry makes it the most recently used
+        self.table[key] = entry
+        self._Evict()
+        return entry
+
+    def Precompute(self, lams, ts, high=20, tol=None):
+        """Computes the matrices for a sequence of times ahead of use.
+
+        lams: sequence of rates lambda
+        ts: sequence of times
+        high: upper bound of the Pmfs
+        tol: if given, choose the upper bound from the tail probability
+        """
+        for t in ts:
+            self.Lookup(lams, t, high, tol)
+
+    def _Evict(self):
+        """Evicts the least recently used matrices until the table fits."""
+        while len(self.table) > 1:
+            too_many = (self.max_entries is not None and
+                        len(self.table) > self.max_entries)
+            too_big = (self.max_bytes is not None and
+                       self.nbytes > self.max_bytes)
+            if not (too_many or too_big):
+                break
+            _, entry = self.table.popitem(last=False)
+            self.nbytes -= sum(array.nbytes for array in entry)
+            self.evictions += 1
+
+    def Stats(self):
+        """Returns a dictionary of usage stats.
+
+        entries: number of matrices in the table
+        nbytes: total size of the matrices
+        hits, misses, evictions: counts since the table was cleared
+        """
+        return dict(entries=len(self.table), nbytes=self.nbytes,
+                    hits=self.hits, misses=self.misses,
+                    evictions=self.evictions)
+
+
+# table shared by the predictive distributions of the football models
+POISSON_TABLE = PoissonTable()
+
+
 def EvalExponentialPdf(x, lam):
     """Computes the exponential PDF.
 
     x: value
     lam: parameter lambda in events per unit time
 
+    Either argument can be a NumPy array.
+
     returns: float probability density
     """
-    return lam * math.exp(-lam * x)
+    return lam * np.exp(-lam * x)
+
+
+def EvalExponentialLogLikelihood(n, total, lam):
+    """Computes the log likelihood of a set of exponential values.
+
+    The likelihood only depends on how many values there are and
+    their total.
+
+    n: number of values
+    total: sum of the values
+    lam: parameter lambda in events per unit time; can be a NumPy array
+
+    returns: float log likelihood
+    """
+    return special.xlogy(n, lam) - lam * total
+
+
+def EvalBernoulliLogLikelihood(heads, tails, p):
+    """Computes the log likelihood of a set of boolean outcomes.
+
+    heads: number of outcomes that were true
+    tails: number of outcomes that were false
+    p: probability of true; can be a NumPy array
+
+    returns: float log likelihood
+    """
+    return special.xlogy(heads, p) + special.xlog1py(tails, -p)
 
 
 def EvalExponentialCdf(x, lam):
@@ -2004,6 +3032,113 @@ class Beta(object):
         return cdf
 
 
+class Gamma(object):
+    """Represents a Gamma distribution.
+
+    Used as the conjugate prior for the rate of a Poisson process.
+
+    See http://en.wikipedia.org/wiki/Gamma_distribution
+    """
+    def __init__(self, alpha=1, beta=0, label=None):
+        """Initializes a Gamma distribution.
+
+        The default, alpha=1 and beta=0, is a flat (improper) prior;
+        it becomes proper after the first update.
+
+        alpha: shape parameter
+        beta: rate parameter
+        label: string label
+        """
+        self.alpha = alpha
+        self.beta = beta
+        self.label = label if label is not None else '_nolegend_'
+
+    def Update(self, data):
+        """Updates a Gamma distribution.
+
+        data: pair of (number of events, total time observed)
+        """
+        events, time = data
+        self.alpha += events
+        self.beta += time
+
+    def _CheckProper(self):
+        """Raises ValueError if the distribution is improper."""
+        if self.beta <= 0:
+            raise ValueError('Gamma: the rate parameter is not positive; '
+                             'update with some data first')
+
+    def Mean(self):
+        """Computes the mean of this distribution."""
+        self._CheckProper()
+        return self.alpha / self.beta
+
+    def Random(self):
+        """Generates a random variate from this distribution."""
+        self._CheckProper()
+        return random.gammavariate(self.alpha, 1.0 / self.beta)
+
+    def Sample(self, n):
+        """Generates a random sample from this distribution.
+
+        n: int sample size
+        """
+        self._CheckProper()
+        size = n,
+        return np.random.gamma(self.alpha, 1.0 / self.beta, size)
+
+    def EvalPdf(self, x):
+        """Evaluates the PDF at x."""
+        self._CheckProper()
+        return stats.gamma.pdf(x, self.alpha, scale=1.0 / self.beta)
+
+    def MakePmf(self, xs=None, label=None):
+        """Returns a Pmf of this distribution.
+
+        Evaluates the PDF at a sequence of points and treats the
+        probability density as a probability mass.
+
+        xs: NumPy array of values; by default, 101 values that cover
+            all but 1e-6 of the probability
+        label: string label
+        """
+        self._CheckProper()
+        if xs is None:
+            high = stats.gamma.ppf(1 - 1e-6, self.alpha, scale=1.0 / self.beta)
+            xs = np.linspace(0, high, 101)
+        pmf = Pmf(label=label)
+        pmf.SetArrays(xs, self.EvalPdf(xs))
+        pmf.Normalize()
+        return pmf
+
+    def PredictivePmf(self, t, tol=1e-12):
+        """Makes the predictive distribution of the number of events.
+
+        If the rate has this Gamma distribution, the number of events in
+        time t has a negative binomial distribution.
+
+        t: length of time
+        tol: how much of the upper tail to leave out
+
+        returns: normalized Pmf of the number of events, with array storage;
+                 its discarded attribute is the probability left out
+        """
+        self._CheckProper()
+        pmf = Pmf()
+        if t <= 0:
+            pmf.SetArrays([0], [1.0])
+            pmf.discarded = 0.0
+            return pmf
+
+        p = self.beta / (self.beta + t)
+        high = int(stats.nbinom.isf(tol, self.alpha, p))
+        ks = np.arange(high + 1)
+        pmf.SetArrays(ks, stats.nbinom.pmf(ks, self.alpha, p))
+        pmf.Normalize()
+        pmf.discarded = float(stats.nbinom.sf(high, self.alpha, p))
+        return pmf
+
+
 class Dirichlet(object):
     """Represents a Dirichlet distribution.
 
@@ -2106,7 +3241,7 @@ def BinomialCoef(n, k):
 
     Returns: float
     """
-    return scipy.misc.comb(n, k)
+    return special.comb(n, k)
 
 
 def LogBinomialCoef(n, k):